@@ -3,23 +3,142 @@
 # python .\api\api_gateway.py --port 8005
 
 import argparse
+import asyncio
+import json
+import math
+import posixpath
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 import httpx
 import hazelcast
+from hazelcast.lifecycle import LifecycleState
 import os, sys
 import uvicorn
 from fastapi.middleware.cors import CORSMiddleware
 import random
-from typing import Optional
+from typing import Any, Optional
+from urllib.parse import urlsplit
+from pydantic import BaseModel
 from fastapi import Depends, Header
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from shared.consul_utils import register_service, deregister_service, fetch_instances, get_consul_kv
+from shared.consul_utils import register_service, deregister_service, get_consul_kv, get_consul_setting, ServiceWatcher
+from shared.http_pool import HTTPClientPool
+from shared.health_monitor import HealthMonitor
+from shared.load_balancer import make_balancer
+from shared.jwt_keys import JWKSCache
+from shared.response_cache import ResponseCache
+from shared.single_flight import SingleFlight
+from shared.admission import ConcurrencyLimiter, RateLimiter
+
+# gateway route prefix -> Consul service name
+UPSTREAM_SERVICES = {
+    "inventory": "inventory-service",
+    "orders": "orders-service",
+    "repairs": "repair-service",
+    "order-parts": "order-parts-service",
+    "auth": "auth-service",
+}
+
+# cached gateway route prefix -> Consul KV key of the Hazelcast map behind it
+CACHED_MAPS = {
+    "inventory": "inventory-map",
+    "orders": "order-map",
+    "repairs": "repairs-map",
+    "order-parts": "order-parts-map",
+}
+
+IDEMPOTENT_METHODS = {"GET", "HEAD"}
+
+HOP_BY_HOP_HEADERS = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "te", "trailer", "transfer-encoding", "upgrade",
+}
+
+# Verified user id passed to upstreams; never taken from the client
+USER_HEADER = "x-user-id"
+
+# Per-user listings are not cached: entry events do not say which user a changed key belongs to
+UNCACHED_PREFIXES = ("/users/",)
+
+# Gateway routes that may be used inside POST /batch: (method, route template) -> upstream.
+# A {param} segment matches exactly one path segment.
+BATCH_ROUTES = {
+    ("POST", "/log_order"): "orders",
+    ("GET", "/orders"): "orders",
+    ("GET", "/orders/{order_id}"): "orders",
+    ("GET", "/orders/{order_id}/status"): "orders",
+    ("POST", "/log_repair"): "repairs",
+    ("GET", "/repairs"): "repairs",
+    ("GET", "/repairs/{repair_id}"): "repairs",
+    ("GET", "/repairs/{repair_id}/status"): "repairs",
+    ("POST", "/log_inventory"): "inventory",
+    ("GET", "/inventory"): "inventory",
+    ("GET", "/inventory/search"): "inventory",
+    ("POST", "/inventory/batch_get"): "inventory",
+    ("GET", "/inventory/{product_id}"): "inventory",
+    ("GET", "/order-parts"): "order-parts",
+}
+
+# Dot segments, encoded dots/slashes and empty segments could reach other upstream routes
+UNSAFE_PATH_PARTS = ("..", "%2e", "%2f", "%5c", "//", "\\")
+
+def resolve_batch_route(method: str, path: str):
+    lowered = path.lower()
+    if any(part in lowered for part in UNSAFE_PATH_PARTS) or posixpath.normpath(path) != path:
+        return None
+    segments = path.split("/")
+    for (route_method, template), service_name in BATCH_ROUTES.items():
+        template_segments = template.split("/")
+        if method != route_method or len(template_segments) != len(segments):
+            continue
+        if all(
+            expected == actual or (expected.startswith("{") and actual)
+            for expected, actual in zip(template_segments, segments)
+        ):
+            return service_name
+    return None
+
+#Runs on_close after sending, even if the body generator was never started
+#(e.g. the client went away before the first chunk)
+class ReleasingStreamingResponse(StreamingResponse):
+    def __init__(self, content, on_close, **kwargs):
+        super().__init__(content, **kwargs)
+        self.on_close = on_close
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.on_close()
+
+class BatchSubRequest(BaseModel):
+    method: str = "GET"
+    path: str
+    body: Optional[Any] = None
+
+class BatchRequest(BaseModel):
+    requests: list[BatchSubRequest]
 
 class APIService:
-    def __init__(self, cluster_name, queue_name, service_name="api-service"):
+    def __init__(self, cluster_name, queue_name, service_name="api-service", http_pool=None, health_monitor=None, local_jwt=True, response_cache=None, single_flight=None, streaming=False,
+                 batch_max_items=50, batch_concurrency=8):
         self.hz_client = hazelcast.HazelcastClient(cluster_name=cluster_name)
+        self.http_pool = http_pool or HTTPClientPool()
+        self.health_monitor = health_monitor or HealthMonitor(self.http_pool)
+        self.balancers = {name: make_balancer("round-robin") for name in UPSTREAM_SERVICES}
+        self.watchers = {}
+        self.local_jwt = local_jwt
+        self.jwks_cache = JWKSCache(self.fetch_jwks)
+        self.response_cache = response_cache
+        self.single_flight = single_flight
+        self.streaming = streaming
+        self.batch_max_items = batch_max_items
+        self.batch_concurrency = batch_concurrency
+        self.limiters = {name: ConcurrencyLimiter() for name in UPSTREAM_SERVICES}
+        self.rate_limiter = RateLimiter()
+        self._limits_task = None
         self.service_name = service_name
         self.msg_queue = self.hz_client.get_queue(queue_name)
         self.service_id = f"{service_name}-{os.getpid()}"
@@ -31,91 +150,352 @@ class APIService:
 
         self.auth_service_instances = []
 
-    async def fetch_service_addresses(self):
-        self.inventory_service_instances = await fetch_instances("inventory-service")
-        self.orders_service_instances = await fetch_instances("orders-service")
-        self.repairs_service_instances = await fetch_instances("repair-service")
-        self.order_parts_service_instances = await fetch_instances("order-parts-service")
-
-        self.auth_service_instances = await fetch_instances("auth-service")
-
-        print(self.inventory_service_instances)
-        print(self.orders_service_instances)
-        print(self.repairs_service_instances)
-        print(self.order_parts_service_instances)
-        print(self.auth_service_instances)
-    
-    async def get_alive_instance(self, instances):
-        for instance in instances:
-            try:
-                async with httpx.AsyncClient(timeout=1.0) as client:
-                    health_url = f"{instance}/health"
-                    resp = await client.get(health_url)
-                    print(f"In get alive from {health_url}, got response {resp}")
-                    if resp.status_code == 200:
-                        return instance
-            except Exception:
+    def update_instances(self, service_name, instances):
+        setattr(self, f"{service_name.replace('-', '_')}_service_instances", instances)
+        self.health_monitor.set_instances(service_name, instances)
+        self.balancers[service_name].forget(instances)
+        self.http_pool.retain({i for group in self.health_monitor.instances.values() for i in group})
+
+    #Consul blocking-query watcher per upstream keeps the instance lists fresh
+    async def watch_service_addresses(self):
+        for name, consul_name in UPSTREAM_SERVICES.items():
+            if name not in self.watchers:
+                self.watchers[name] = ServiceWatcher(
+                    consul_name,
+                    on_change=lambda instances, name=name: self.update_instances(name, instances),
+                )
+        await asyncio.gather(*(watcher.start() for watcher in self.watchers.values()))
+
+    #Strategy per upstream, e.g. "gateway-lb-inventory" = "p2c-ewma" in Consul KV
+    async def configure_load_balancing(self, default_strategy="round-robin", ewma_alpha=0.3):
+        for name in UPSTREAM_SERVICES:
+            strategy = await get_consul_kv(f"gateway-lb-{name}") or default_strategy
+            self.balancers[name] = make_balancer(strategy, ewma_alpha)
+            print(f"Load balancing for {name}: {self.balancers[name].name}")
+
+    #Drop cached list and item responses whenever the backing map changes
+    async def enable_response_cache(self):
+        for service_name, kv_key in CACHED_MAPS.items():
+            map_name = await get_consul_kv(kv_key)
+            if not map_name:
                 continue
-        return None
 
-    async def proxy_request(self, service_name: str, method: str, path: str, request: Request):
-
-        if service_name == "inventory":
-            instances = self.inventory_service_instances
-            print(f"Looking for inventory: {instances}")
-        elif service_name == "orders":
-            instances = self.orders_service_instances
-        elif service_name == "repairs":
-            instances = self.repairs_service_instances
-        elif service_name == "order-parts":
-            instances = self.order_parts_service_instances
-        elif service_name == "auth":  # Додано обробку для сервісу автентифікації
-            instances = self.auth_service_instances
-        else:
+            def on_entry_event(event, service_name=service_name):
+                self.response_cache.invalidate(service_name, {
+                    f"/{service_name}", f"/{service_name}/{event.key}", f"/{service_name}/{event.key}/status", f"/{service_name}/search",
+                })
+
+            def on_map_event(event, service_name=service_name):
+                self.response_cache.invalidate(service_name)
+
+            self.hz_client.get_map(map_name).add_entry_listener(
+                include_value=False,
+                added_func=on_entry_event,
+                updated_func=on_entry_event,
+                removed_func=on_entry_event,
+                evicted_func=on_entry_event,
+                expired_func=on_entry_event,
+                merged_func=on_entry_event,
+                clear_all_func=on_map_event,
+                evict_all_func=on_map_event,
+            )
+
+        # Events may be missed while disconnected from the cluster
+        def on_lifecycle_change(state):
+            if state == LifecycleState.CONNECTED:
+                for service_name in CACHED_MAPS:
+                    self.response_cache.invalidate(service_name)
+
+        self.hz_client.lifecycle_service.add_listener(on_lifecycle_change)
+
+    #Reloads admission and rate limits from Consul KV so they can be tuned live
+    async def load_limits(self):
+        max_concurrent = await get_consul_setting("gateway-max-concurrent", 64)
+        max_queue = await get_consul_setting("gateway-max-queue", 128)
+        queue_timeout = await get_consul_setting("gateway-queue-timeout", 1.0)
+        for name, limiter in self.limiters.items():
+            limiter.update(
+                await get_consul_setting(f"gateway-max-concurrent-{name}", max_concurrent),
+                await get_consul_setting(f"gateway-max-queue-{name}", max_queue),
+                queue_timeout,
+            )
+        self.rate_limiter.update(
+            await get_consul_setting("gateway-user-rate", 20.0),
+            await get_consul_setting("gateway-user-burst", 60),
+        )
+        # /batch charges all but one of its requests at once, see batch()
+        if self.batch_max_items - 1 > self.rate_limiter.burst:
+            print(f"gateway-batch-max-items ({self.batch_max_items}) is above gateway-user-burst "
+                  f"({self.rate_limiter.burst}); larger batches are rejected with 400")
+
+    async def refresh_limits(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.load_limits()
+            except Exception as e:
+                print("Failed to refresh gateway limits:", e)
+
+    async def admit(self, service_name):
+        if not await self.limiters[service_name].acquire():
+            raise HTTPException(
+                status_code=503,
+                detail=f"{UPSTREAM_SERVICES[service_name]} is overloaded",
+                headers={"Retry-After": "1"},
+            )
+
+    def check_rate_limit(self, user, cost=1):
+        retry_after = self.rate_limiter.acquire(user.get("user_id") or user.get("login"), cost)
+        if retry_after == math.inf:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Request costs {cost} requests, more than the rate limit burst of {self.rate_limiter.burst}",
+            )
+        if retry_after:
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+            )
+
+    #Healthy instance from the background health table, no network call
+    async def get_alive_instance(self, service_name):
+        return self.health_monitor.pick(service_name, self.balancers[service_name])
+
+    async def proxy_request(self, service_name: str, method: str, path: str, request: Request, stream=False, user=None):
+        if service_name not in UPSTREAM_SERVICES:
             raise HTTPException(status_code=400, detail="Unknown service")
 
-        if not instances:
-            print("No instances, fetching new")
-            await self.fetch_service_addresses()
-
-        instance_url = await self.get_alive_instance(instances)
-        if not instance_url:
-            raise HTTPException(status_code=503, detail=f"No alive instances for {service_name}-service")
+        #Large listings (and NDJSON) are passed through as-is instead of being cached or coalesced
+        if stream and (self.streaming or request.query_params.get("format") == "ndjson"):
+            return await self.stream_request(service_name, method, path, request)
 
-        url = f"{instance_url}{path}"
         headers = dict(request.headers)
+        headers.pop("host", None)
+        headers.pop(USER_HEADER, None)
+        if user is not None:
+            headers[USER_HEADER] = user["user_id"]
         body = await request.body()
 
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            response = await client.request(method, url, headers=headers, content=body)
+        status_code, result = await self.upstream_call(service_name, method, path, headers, body, request.url.query)
+        #Keeps statuses such as 202 Accepted (async intake) and upstream errors
+        if status_code != 200:
+            return JSONResponse(status_code=status_code, content=result)
+        return result
+
+    #Returns (status_code, decoded body); shared by proxied routes and /batch
+    async def upstream_call(self, service_name: str, method: str, path: str, headers: dict, body=b"", query=""):
+        cache_key = None
+        if (method == "GET" and self.response_cache is not None and service_name in CACHED_MAPS
+                and not path.startswith(UNCACHED_PREFIXES)):
+            cache_key = (path, query)
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                return 200, cached
+
+        #Identical concurrent reads within one auth scope share a single upstream call
+        if method in IDEMPOTENT_METHODS and self.single_flight is not None:
+            flight_key = (service_name, method, path, query, headers.get("authorization"))
+            return await self.single_flight.do(
+                flight_key, lambda: self.forward_request(service_name, method, path, headers, body, query, cache_key)
+            )
+        return await self.forward_request(service_name, method, path, headers, body, query, cache_key)
+
+    async def forward_request(self, service_name: str, method: str, path: str, headers: dict, body=b"", query="", cache_key=None):
+        if cache_key is not None:
+            generation = self.response_cache.generation(service_name)
+
+        limiter = self.limiters[service_name]
+        await self.admit(service_name)
+        try:
+            instance_url = await self.get_alive_instance(service_name)
+            if not instance_url:
+                raise HTTPException(status_code=503, detail=f"No alive instances for {UPSTREAM_SERVICES[service_name]}")
+
+            url = f"{path}?{query}" if query else path
+
+            balancer = self.balancers[service_name]
+            started_at = balancer.on_start(instance_url)
+            try:
+                response = await self.http_pool.request(instance_url, method, url, headers=headers, content=body)
+            except httpx.RequestError as e:
+                self.health_monitor.record_failure(instance_url)
+                print(f"Request to {instance_url}{path} failed: {e}")
+                raise HTTPException(status_code=502, detail=f"{UPSTREAM_SERVICES[service_name]} request failed")
+            finally:
+                balancer.on_finish(instance_url, started_at)
+        finally:
+            limiter.release()
+
+        if response.status_code >= 500:
+            self.health_monitor.record_failure(instance_url)
+        else:
+            self.health_monitor.record_success(instance_url)
+
+        result = response.json() if 'application/json' in response.headers.get("content-type", "") else response.text
+        if cache_key is not None and response.status_code == 200:
+            self.response_cache.put(cache_key, result, service_name, generation)
+        return response.status_code, result
+
+    #Runs sub-requests concurrently under one token check, capped by batch_concurrency
+    async def run_batch(self, sub_requests, request: Request, user=None):
+        if len(sub_requests) > self.batch_max_items:
+            raise HTTPException(status_code=400, detail=f"Batch is limited to {self.batch_max_items} requests")
+
+        semaphore = asyncio.Semaphore(self.batch_concurrency)
+        authorization = request.headers.get("authorization")
+
+        async def run_one(sub_request):
+            method = sub_request.method.upper()
+            url = urlsplit(sub_request.path)
+            item = {"method": method, "path": sub_request.path}
+
+            service_name = resolve_batch_route(method, url.path)
+            if service_name is None:
+                item.update({"status": 404, "body": {"detail": "Unknown route"}})
+                return item
+
+            headers = {"authorization": authorization} if authorization else {}
+            if user is not None:
+                headers[USER_HEADER] = user["user_id"]
+            body = b""
+            if sub_request.body is not None:
+                headers["content-type"] = "application/json"
+                body = json.dumps(sub_request.body).encode()
+
+            async with semaphore:
+                try:
+                    status_code, result = await self.upstream_call(service_name, method, url.path, headers, body, url.query)
+                except HTTPException as e:
+                    status_code, result = e.status_code, {"detail": e.detail}
+            item.update({"status": status_code, "body": result})
+            return item
+
+        return {"responses": await asyncio.gather(*(run_one(sub_request) for sub_request in sub_requests))}
+
+    #Forwards upstream status, headers and raw body chunks without decoding them
+    async def stream_request(self, service_name: str, method: str, path: str, request: Request, stream_body=False):
+        limiter = self.limiters[service_name]
+        balancer = self.balancers[service_name]
+        await self.admit(service_name)
+        instance_url = None
+        started_at = None
+        response = None
+        released = False
+
+        #Frees the limiter and balancer slots exactly once, whichever way the request ends
+        async def release():
+            nonlocal released
+            if released:
+                return
+            released = True
+            try:
+                if response is not None:
+                    await response.aclose()
+            finally:
+                if started_at is not None:
+                    balancer.on_finish(instance_url, started_at)
+                limiter.release()
+
+        try:
+            instance_url = await self.get_alive_instance(service_name)
+            if not instance_url:
+                raise HTTPException(status_code=503, detail=f"No alive instances for {UPSTREAM_SERVICES[service_name]}")
+
+            headers = {
+                name: value for name, value in request.headers.items()
+                if name not in HOP_BY_HOP_HEADERS and name not in ("host", USER_HEADER)
+            }
+            #Large uploads are forwarded chunk by chunk as well
+            body = request.stream() if stream_body else await request.body()
+
+            query = request.url.query
+            client = self.http_pool.get_client(instance_url)
+            upstream_request = client.build_request(method, f"{path}?{query}" if query else path, headers=headers, content=body)
+
+            started_at = balancer.on_start(instance_url)
+            try:
+                response = await client.send(upstream_request, stream=True)
+            except httpx.RequestError as e:
+                self.health_monitor.record_failure(instance_url)
+                print(f"Request to {instance_url}{path} failed: {e}")
+                raise HTTPException(status_code=502, detail=f"{UPSTREAM_SERVICES[service_name]} request failed")
+        except BaseException:
+            # Also on cancellation or a client disconnect mid-upload
+            await release()
+            raise
+
+        if response.status_code >= 500:
+            self.health_monitor.record_failure(instance_url)
+        else:
+            self.health_monitor.record_success(instance_url)
 
-        return response.json() if 'application/json' in response.headers.get("content-type", "") else response.text
-    
+        async def body_chunks():
+            try:
+                async for chunk in response.aiter_raw():
+                    yield chunk
+            finally:
+                await release()
+
+        response_headers = {
+            name: value for name, value in response.headers.items()
+            if name.lower() not in HOP_BY_HOP_HEADERS
+        }
+        return ReleasingStreamingResponse(body_chunks(), release, status_code=response.status_code, headers=response_headers)
+
+    async def auth_request(self, path: str, headers=None):
+        instance_url = await self.get_alive_instance("auth")
+        if not instance_url:
+            return None
+
+        balancer = self.balancers["auth"]
+        started_at = balancer.on_start(instance_url)
+        try:
+            resp = await self.http_pool.request(instance_url, "GET", path, headers=headers)
+        except Exception:
+            self.health_monitor.record_failure(instance_url)
+            return None
+        finally:
+            balancer.on_finish(instance_url, started_at)
+
+        if resp.status_code >= 500:
+            self.health_monitor.record_failure(instance_url)
+            return None
+        self.health_monitor.record_success(instance_url)
+        return resp
+
+    async def fetch_jwks(self):
+        resp = await self.auth_request("/auth/jwks")
+        if resp is None or resp.status_code != 200:
+            print("Failed to fetch JWKS from auth-service")
+            return None
+        return resp.json()
 
     async def validate_token(self, authorization: str):
         if not authorization:
             return None
             
         token = authorization.replace("Bearer ", "")
-        
-        if not self.auth_service_instances:
-            await self.fetch_service_addresses()
-            
-        instance_url = await self.get_alive_instance(self.auth_service_instances)
-        
-        headers = {"Authorization": f"Bearer {token}"}
 
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            try:
-                full_url = f"{instance_url}/auth/verify"
-                resp = await client.get(full_url, headers=headers)
-                if resp.status_code == 200:
-                    return resp.json()
-                return None
-            except Exception:
+        #Verify the RS256 signature in-process with the cached auth-service keys
+        if self.local_jwt:
+            claims = await self.jwks_cache.verify(token)
+            if claims is None or claims.get("sub") is None or claims.get("user_id") is None:
                 return None
+            return {"login": claims["sub"], "user_id": claims["user_id"]}
+
+        resp = await self.auth_request("/auth/verify", headers={"Authorization": f"Bearer {token}"})
+        if resp is not None and resp.status_code == 200:
+            return resp.json()
+        return None
             
-    def shutdown(self):
+    async def shutdown(self):
+        if self._limits_task:
+            self._limits_task.cancel()
+        await asyncio.gather(*(watcher.stop() for watcher in self.watchers.values()))
+        await self.health_monitor.stop()
+        await self.http_pool.close()
+        print("HTTP client pool closed")
         self.hz_client.shutdown()
         print("Hazelcast client shutdown")
 
@@ -147,8 +527,9 @@ async def verify_token(authorization: Optional[str] = Header(None)):
             detail="Invalid or expired token",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
-    return validation_result.get("user")
+
+    api_service.check_rate_limit(validation_result)
+    return validation_result
 
 # -------------- DEFAULT ENDPOINTS ---------------
 @app.on_event("startup")
@@ -156,29 +537,92 @@ async def startup_event():
     global api_service
     cluster_name_ = await get_consul_kv("cluster-name")
     queue_name_ = await get_consul_kv("queue-name")
-    api_service = APIService(cluster_name=cluster_name_, queue_name = queue_name_)
+    http_pool = HTTPClientPool(
+        max_connections=await get_consul_setting("gateway-max-connections", 100),
+        max_keepalive_connections=await get_consul_setting("gateway-max-keepalive-connections", 20),
+        keepalive_expiry=await get_consul_setting("gateway-keepalive-expiry", 30.0),
+        http2=await get_consul_setting("gateway-http2", False),
+    )
+    health_monitor = HealthMonitor(
+        http_pool,
+        interval=await get_consul_setting("gateway-health-interval", 5.0),
+        failure_threshold=await get_consul_setting("gateway-breaker-failures", 3),
+        reset_timeout=await get_consul_setting("gateway-breaker-reset", 10.0),
+    )
+    api_service = APIService(
+        cluster_name=cluster_name_, queue_name = queue_name_, http_pool=http_pool, health_monitor=health_monitor,
+        local_jwt=await get_consul_setting("gateway-local-jwt", True),
+        streaming=await get_consul_setting("gateway-streaming", False),
+        batch_max_items=await get_consul_setting("gateway-batch-max-items", 50),
+        batch_concurrency=await get_consul_setting("gateway-batch-concurrency", 8),
+    )
+    if await get_consul_setting("gateway-cache-enabled", True):
+        api_service.response_cache = ResponseCache(
+            max_entries=await get_consul_setting("gateway-cache-size", 1024),
+            ttl=await get_consul_setting("gateway-cache-ttl", 30.0),
+        )
+        await api_service.enable_response_cache()
+    if await get_consul_setting("gateway-single-flight", True):
+        api_service.single_flight = SingleFlight()
+    await api_service.load_limits()
+    api_service._limits_task = asyncio.create_task(
+        api_service.refresh_limits(await get_consul_setting("gateway-limits-refresh-interval", 15.0))
+    )
     port = int(os.environ["APP_PORT"])
     await register_service(api_service.service_name, api_service.service_id, "localhost", port)
-    await api_service.fetch_service_addresses()
+    await api_service.configure_load_balancing(
+        default_strategy=await get_consul_setting("gateway-lb-strategy", "round-robin"),
+        ewma_alpha=await get_consul_setting("gateway-lb-ewma-alpha", 0.3),
+    )
+    await api_service.watch_service_addresses()
+    api_service.health_monitor.start()
 
 @app.on_event("shutdown")
 async def shutdown():
     await deregister_service(api_service.service_id)
-    api_service.shutdown()
+    await api_service.shutdown()
     print("API Service shutdown")
 
 @app.get("/health")
 async def health_check():
     return {"status": "OK"}
 
+@app.get("/stats")
+async def get_stats():
+    return {
+        "upstreams": api_service.health_monitor.stats(),
+        "load_balancing": {name: balancer.stats() for name, balancer in api_service.balancers.items()},
+        "response_cache": api_service.response_cache.stats() if api_service.response_cache else None,
+        "single_flight": api_service.single_flight.stats() if api_service.single_flight else None,
+        "admission": {name: limiter.stats() for name, limiter in api_service.limiters.items()},
+        "rate_limit": api_service.rate_limiter.stats(),
+    }
+
+# -------------- BATCH ENDPOINTS ---------------
+@app.post("/batch")
+async def batch(data: BatchRequest, request: Request, user=Depends(verify_token)):
+    # verify_token already charged one request to the user's bucket
+    if len(data.requests) > 1:
+        api_service.check_rate_limit(user, cost=len(data.requests) - 1)
+    return await api_service.run_batch(data.requests, request, user)
+
 # -------------- ORDER ENDPOINTS ---------------
 @app.post("/log_order")
 async def log_order(request: Request, user=Depends(verify_token)):
-    return await api_service.proxy_request("orders", "POST", "/log_order", request)
+    return await api_service.proxy_request("orders", "POST", "/log_order", request, user=user)
 
 @app.get("/orders")
 async def get_orders(request: Request, user=Depends(verify_token)):
-    return await api_service.proxy_request("orders", "GET", "/orders", request)
+    return await api_service.proxy_request("orders", "GET", "/orders", request, stream=True)
+
+#Orders of the calling user, found through the user_id index
+@app.get("/my/orders")
+async def get_my_orders(request: Request, user=Depends(verify_token)):
+    return await api_service.proxy_request("orders", "GET", f"/users/{user['user_id']}/orders", request, stream=True)
+
+@app.get("/orders/{order_id}/status")
+async def get_order_status(order_id: str, request: Request, user=Depends(verify_token)):
+    return await api_service.proxy_request("orders", "GET", f"/orders/{order_id}/status", request)
 
 @app.get("/orders/{order_id}")
 async def get_order(order_id: str, request: Request, user=Depends(verify_token)):
@@ -187,11 +631,19 @@ async def get_order(order_id: str, request: Request, user=Depends(verify_token))
 # -------------- REPAIR ENDPOINTS ---------------
 @app.post("/log_repair")
 async def log_repair(request: Request, user=Depends(verify_token)):
-    return await api_service.proxy_request("repairs", "POST", "/log_repair", request)
+    return await api_service.proxy_request("repairs", "POST", "/log_repair", request, user=user)
 
 @app.get("/repairs")
 async def get_repairs(request: Request, user=Depends(verify_token)):
-    return await api_service.proxy_request("repairs", "GET", "/repairs", request)
+    return await api_service.proxy_request("repairs", "GET", "/repairs", request, stream=True)
+
+@app.get("/my/repairs")
+async def get_my_repairs(request: Request, user=Depends(verify_token)):
+    return await api_service.proxy_request("repairs", "GET", f"/users/{user['user_id']}/repairs", request, stream=True)
+
+@app.get("/repairs/{repair_id}/status")
+async def get_repair_status(repair_id: str, request: Request, user=Depends(verify_token)):
+    return await api_service.proxy_request("repairs", "GET", f"/repairs/{repair_id}/status", request)
 
 @app.get("/repairs/{repair_id}")
 async def get_repair(repair_id: str, request: Request, user=Depends(verify_token)):
@@ -202,9 +654,21 @@ async def get_repair(repair_id: str, request: Request, user=Depends(verify_token
 async def log_inventory(request: Request, user=Depends(verify_token)):
     return await api_service.proxy_request("inventory", "POST", "/log_inventory", request)
 
+@app.post("/log_inventory/stream")
+async def log_inventory_stream(request: Request, user=Depends(verify_token)):
+    return await api_service.stream_request("inventory", "POST", "/log_inventory/stream", request, stream_body=True)
+
 @app.get("/inventory")
 async def get_inventory(request: Request, user=Depends(verify_token)):
-    return await api_service.proxy_request("inventory", "GET", "/inventory", request)
+    return await api_service.proxy_request("inventory", "GET", "/inventory", request, stream=True)
+
+@app.get("/inventory/search")
+async def search_inventory(request: Request, user=Depends(verify_token)):
+    return await api_service.proxy_request("inventory", "GET", "/inventory/search", request, stream=True)
+
+@app.post("/inventory/batch_get")
+async def batch_get_inventory(request: Request, user=Depends(verify_token)):
+    return await api_service.proxy_request("inventory", "POST", "/inventory/batch_get", request)
 
 @app.get("/inventory/{product_id}")
 async def get_inventory_item(product_id: str, request: Request, user=Depends(verify_token)):
@@ -213,7 +677,7 @@ async def get_inventory_item(product_id: str, request: Request, user=Depends(ver
 # -------------- ORDER PARTS ENDPOINTS ---------------
 @app.get("/order-parts")
 async def get_order_parts(request: Request):
-    return await api_service.proxy_request("order-parts", "GET", "/order-parts", request)
+    return await api_service.proxy_request("order-parts", "GET", "/order-parts", request, stream=True)
 
 # -------------- STARTUP ---------------
 if __name__ == "__main__":
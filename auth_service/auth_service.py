@@ -1,13 +1,11 @@
 import os
 import sys
 import uuid
-import json
 import argparse
+import asyncio
 import hazelcast
-import secrets
 import uvicorn
 import datetime
-import bcrypt
 from typing import Dict, Optional
 from pydantic import BaseModel
 from fastapi import FastAPI, Depends, HTTPException, status
@@ -17,19 +15,18 @@ from jose import JWTError, jwt
 
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from shared.consul_utils import register_service, deregister_service, get_consul_kv
+from shared.consul_utils import register_service, deregister_service, get_consul_kv, get_consul_setting
+from shared.jwt_keys import ALGORITHM, active_kid, load_signing_keys, jwks_from_key_set
+from shared.hz_async import AsyncHazelcast
+from shared.near_cache import NearCache
+from shared.password_hasher import PasswordHasher, PasswordHasherBusy
+from shared.schemas import UserInDB, COMPACT_SERIALIZERS, to_record
 
 
 class User(BaseModel):
     login: str
     password: str
 
-#to store user info in the db - login and hashed password
-class UserInDB(BaseModel):
-    login: str
-    hashed_password: str
-    user_id: str
-
 class Token(BaseModel):
     token: str
     token_type: str
@@ -38,19 +35,60 @@ class TokenData(BaseModel):
     login: Optional[str] = None
     user_id: Optional[str] = None
 
-SECRET_KEY = secrets.token_hex(32)  # Секретний ключ для JWT
-ALGORITHM = "HS256"  # Алгоритм для JWT
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # Час життя токена (24 години)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+def credentials_exception():
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Не вдалося підтвердити облікові дані",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
 class AuthService:
     def __init__(self, cluster_name, queue_name, map_name, service_name="auth-service"):
-        self.hz_client = hazelcast.HazelcastClient(cluster_name=cluster_name)
-        self.users_map = self.hz_client.get_map(map_name).blocking()
+        self.hz_client = hazelcast.HazelcastClient(cluster_name=cluster_name, compact_serializers=COMPACT_SERIALIZERS)
+        self.hz = AsyncHazelcast(self.hz_client)
+        self.users_map = self.hz.get_map(map_name)
         self.service_name = service_name
-        self.msg_queue = self.hz_client.get_queue(queue_name)
+        self.msg_queue = self.hz.get_queue(queue_name)
         self.service_id = f"{service_name}-{os.getpid()}"
+        self.signing_keys = None
+        self.jwks = {"keys": []}
+        self.verification_keys = {}
+        self._key_refresh_task = None
+        self.near_cache = None
+        self.password_hasher = None
+        self.stateless_verify = False
+
+    #bcrypt work goes to worker processes; workers=0 means one per core
+    async def start_password_hasher(self, workers, rounds, max_queue):
+        self.password_hasher = PasswordHasher(workers=workers or None, rounds=rounds, max_queue=max_queue)
+        await self.password_hasher.start()
+
+    #Keeps decoded users of active logins in process memory
+    async def enable_near_cache(self, max_size, ttl, eviction):
+        self.near_cache = NearCache(max_size=max_size, ttl=ttl, eviction=eviction)
+        await self.near_cache.listen(self.users_map, self.hz_client.lifecycle_service)
+
+    #RS256 keys are shared by all auth instances through Consul KV
+    async def load_signing_keys(self):
+        self.signing_keys = await load_signing_keys()
+        self.jwks = jwks_from_key_set(self.signing_keys)
+        self.verification_keys = {key["kid"]: key for key in self.jwks["keys"]}
+
+    #Picks up keys rotated with `python shared/jwt_keys.py`
+    async def refresh_signing_keys(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.load_signing_keys()
+            except Exception as e:
+                print("Failed to refresh signing keys:", e)
+
+    def start_key_refresh(self, interval):
+        self._key_refresh_task = asyncio.create_task(self.refresh_signing_keys(interval))
     
 
     #To create a jwt access token
@@ -58,70 +96,92 @@ class AuthService:
         to_encode = data.copy()
         expire = datetime.datetime.utcnow() + datetime.timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
         to_encode.update({"exp": expire})
-        encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+        kid = active_kid(self.signing_keys)
+        encoded_jwt = jwt.encode(to_encode, self.signing_keys["keys"][kid], algorithm=ALGORITHM, headers={"kid": kid})
         return encoded_jwt
     
     #To verify if entered password is correct
-    def verify_password(self, plain_password, hashed_password):
-        return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+    async def verify_password(self, plain_password, hashed_password):
+        return await self.password_hasher.verify(plain_password, hashed_password)
 
     #To hash the password
-    def get_password_hash(self, password):
-        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    async def get_password_hash(self, password):
+        return await self.password_hasher.hash(password)
 
     #To check if the user is in the db and return user data
-    def get_user(self, login: str):
-        user_data = self.users_map.get(login)
+    async def get_user(self, login: str):
+        if self.near_cache is not None:
+            user = self.near_cache.get(login)
+            if user is not None:
+                return user
+            generation = self.near_cache.generation()
+
+        user_data = await self.users_map.get(login)
         if user_data:
-            user_dict = json.loads(user_data)
-            return UserInDB(**user_dict)
+            user = to_record(UserInDB, user_data)
+            if self.near_cache is not None:
+                self.near_cache.put(login, user, generation)
+            return user
         return None
     
     #to login existing user
-    def authenticate_user(self, login: str, password: str):
-        user = self.get_user(login)
+    async def authenticate_user(self, login: str, password: str):
+        user = await self.get_user(login)
         if not user:
             return False
-        if not self.verify_password(password, user.hashed_password):
+        if not await self.verify_password(password, user.hashed_password):
             return False
         return user
 
 
     #to register a new user
-    def register_user(self, user: User):
-        if self.get_user(user.login):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Користувач з таким логіном вже існує"
-            )
+    #The early check skips hashing for taken logins; put_if_absent decides
+    #when two registrations of the same login race through the hashing
+    async def register_user(self, user: User):
+        login_taken = HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Користувач з таким логіном вже існує"
+        )
+        if await self.get_user(user.login):
+            raise login_taken
         user_id = str(uuid.uuid4())
-        hashed_password = self.get_password_hash(user.password)
+        hashed_password = await self.get_password_hash(user.password)
         user_in_db = UserInDB(login=user.login, hashed_password=hashed_password, user_id=user_id)
-        self.users_map.put(user.login, json.dumps(user_in_db.dict()))
+        if await self.users_map.put_if_absent(user.login, user_in_db) is not None:
+            raise login_taken
+        if self.near_cache is not None:
+            self.near_cache.invalidate([user.login])
         return {"login": user.login, "user_id": user_id}
 
-    async def get_current_user(self, token: str = Depends(oauth2_scheme)):
-        credentials_exception = HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Не вдалося підтвердити облікові дані",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    #Checks the signature and expiry and returns the signed claims, no lookups
+    def decode_access_token(self, token: str):
         try:
-            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            kid = jwt.get_unverified_header(token).get("kid")
+            public_key = self.verification_keys.get(kid)
+            if public_key is None:
+                raise credentials_exception()
+            payload = jwt.decode(token, public_key, algorithms=[ALGORITHM])
             login: str = payload.get("sub")
             user_id: str = payload.get("user_id")
             if login is None or user_id is None:
-                raise credentials_exception
-            token_data = TokenData(login=login, user_id=user_id)
+                raise credentials_exception()
+            return TokenData(login=login, user_id=user_id)
         except JWTError:
-            raise credentials_exception
-        user = self.get_user(token_data.login)
+            raise credentials_exception()
+
+    async def get_current_user(self, token: str = Depends(oauth2_scheme)):
+        token_data = self.decode_access_token(token)
+        user = await self.get_user(token_data.login)
         if user is None:
-            raise credentials_exception
-        return user    
+            raise credentials_exception()
+        return user
 
     def shutdown(self):
-        self.hz_client.shutdown()
+        if self._key_refresh_task:
+            self._key_refresh_task.cancel()
+        if self.password_hasher:
+            self.password_hasher.shutdown()
+        self.hz.shutdown()
         print("Hazelcast client shutdown")
 
 app = FastAPI()
@@ -144,6 +204,21 @@ async def startup_event():
     queue_name_ = await get_consul_kv("queue-name")
     map_name_ = await get_consul_kv("auth-map")
     auth_service = AuthService(cluster_name=cluster_name_, queue_name = queue_name_, map_name=map_name_, service_name="auth-service")
+    await auth_service.load_signing_keys()
+    auth_service.start_key_refresh(await get_consul_setting("auth-key-refresh-interval", 60.0))
+    await auth_service.start_password_hasher(
+        workers=await get_consul_setting("auth-hash-workers", 0),
+        rounds=await get_consul_setting("auth-bcrypt-rounds", 12),
+        max_queue=await get_consul_setting("auth-hash-max-queue", 256),
+    )
+    #Stateless: tokens of deleted users stay valid until they expire
+    auth_service.stateless_verify = await get_consul_setting("auth-stateless-verify", False)
+    if await get_consul_setting("auth-near-cache-enabled", True):
+        await auth_service.enable_near_cache(
+            max_size=await get_consul_setting("auth-near-cache-size", 10000),
+            ttl=await get_consul_setting("auth-near-cache-ttl", 60.0),
+            eviction=await get_consul_setting("auth-near-cache-eviction", "lru"),
+        )
     
     port = int(os.environ["APP_PORT"])
     await register_service(auth_service.service_name, auth_service.service_id, "localhost", port)
@@ -160,15 +235,28 @@ async def shutdown():
 async def health_check():
     return {"status": "OK"}
 
+@app.get("/stats")
+async def get_stats():
+    return {
+        "near_cache": auth_service.near_cache.stats() if auth_service.near_cache else None,
+        "password_hasher": auth_service.password_hasher.stats(),
+    }
+
 # -------------- AUTHENTIFICATION ENDPOINTS ---------------
 
 @app.post("/auth/register", response_model=Dict)
 async def register(user: User):
-    return auth_service.register_user(user)
+    try:
+        return await auth_service.register_user(user)
+    except PasswordHasherBusy:
+        raise HTTPException(status_code=503, detail="Too many requests, try again", headers={"Retry-After": "1"})
 
 @app.post("/auth/login", response_model=Token)
 async def login(user: User):
-    db_user = auth_service.authenticate_user(user.login, user.password)
+    try:
+        db_user = await auth_service.authenticate_user(user.login, user.password)
+    except PasswordHasherBusy:
+        raise HTTPException(status_code=503, detail="Too many requests, try again", headers={"Retry-After": "1"})
     if not db_user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -180,9 +268,17 @@ async def login(user: User):
     )
     return {"token": access_token, "token_type": "bearer"}
 
+#Public signing keys, used by the gateway to verify tokens locally
+@app.get("/auth/jwks", response_model=Dict)
+async def get_jwks():
+    return auth_service.jwks
+
 @app.get("/auth/verify", response_model=Dict)
 async def verify_token(token: str = Depends(oauth2_scheme)):
-    user = await auth_service.get_current_user(token)
+    if auth_service.stateless_verify:
+        user = auth_service.decode_access_token(token)
+    else:
+        user = await auth_service.get_current_user(token)
     return {"login": user.login, "user_id": user.user_id}
 
 # -------------- STARTUP ---------------
@@ -0,0 +1,91 @@
+# Needs a running auth service (and Hazelcast behind it), same as test_auth_service.py
+import argparse
+import asyncio
+import time
+import uuid
+
+import httpx
+
+
+def percentile(samples, p):
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p / 100))]
+
+
+async def login_storm(client, base_url, user, concurrency, duration):
+    deadline = time.perf_counter() + duration
+    counts = {"ok": 0, "busy": 0, "failed": 0}
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            resp = await client.post(f"{base_url}/auth/login", json=user)
+            if resp.status_code == 200:
+                counts["ok"] += 1
+            elif resp.status_code == 503:
+                counts["busy"] += 1
+            else:
+                counts["failed"] += 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return counts
+
+
+# Latency of cheap requests sent at a steady rate while the storm runs
+async def probe(client, url, headers, duration, interval):
+    latencies = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        await client.get(url, headers=headers)
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+def report(name, latencies):
+    print(f"{name:<14} p50 {percentile(latencies, 50):7.1f} ms   p99 {percentile(latencies, 99):7.1f} ms   "
+          f"({len(latencies)} requests)")
+
+
+async def main(base_url, concurrency, duration, probe_interval):
+    user = {"login": f"bench-{uuid.uuid4().hex[:8]}", "password": "bench-password"}
+    limits = httpx.Limits(max_connections=concurrency + 10)
+    async with httpx.AsyncClient(timeout=None, limits=limits) as client:
+        (await client.post(f"{base_url}/auth/register", json=user)).raise_for_status()
+        resp = await client.post(f"{base_url}/auth/login", json=user)
+        resp.raise_for_status()
+        headers = {"Authorization": f"Bearer {resp.json()['token']}"}
+
+        print("===== AUTH LOGIN STORM BENCHMARK =====")
+        print(f"{concurrency} concurrent logins for {duration}s")
+
+        print("--- idle ---")
+        idle_health, idle_verify = await asyncio.gather(
+            probe(client, f"{base_url}/health", {}, duration / 2, probe_interval),
+            probe(client, f"{base_url}/auth/verify", headers, duration / 2, probe_interval),
+        )
+        report("/health", idle_health)
+        report("/auth/verify", idle_verify)
+
+        print("--- during login storm ---")
+        counts, health, verify = await asyncio.gather(
+            login_storm(client, base_url, user, concurrency, duration),
+            probe(client, f"{base_url}/health", {}, duration, probe_interval),
+            probe(client, f"{base_url}/auth/verify", headers, duration, probe_interval),
+        )
+        print(f"Logins/s: {counts['ok'] / duration:.1f} (rejected busy: {counts['busy']}, failed: {counts['failed']})")
+        report("/health", health)
+        report("/auth/verify", verify)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:5011")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--probe-interval", type=float, default=0.01)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.url, args.concurrency, args.duration, args.probe_interval))
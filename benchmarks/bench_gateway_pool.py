@@ -0,0 +1,98 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from shared.http_pool import HTTPClientPool
+
+# Stub upstream standing in for inventory-service
+stub = FastAPI()
+
+@stub.get("/health")
+async def health_check():
+    return {"status": "OK"}
+
+@stub.get("/inventory")
+async def get_inventory():
+    return {f"part-{i}": {"available_quantity": i} for i in range(20)}
+
+
+async def start_stub(port):
+    config = uvicorn.Config(stub, host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    return server, task
+
+
+# Old gateway behaviour: a fresh client (and connection) per proxied call
+async def proxy_per_request(instance_url):
+    async with httpx.AsyncClient(timeout=5.0) as client:
+        resp = await client.get(f"{instance_url}/health")
+        if resp.status_code != 200:
+            return None
+    async with httpx.AsyncClient(timeout=5.0) as client:
+        resp = await client.get(f"{instance_url}/inventory")
+    return resp.json()
+
+
+# New gateway behaviour: shared keep-alive pool per upstream
+def make_pooled_proxy(pool):
+    async def proxy_pooled(instance_url):
+        resp = await pool.request(instance_url, "GET", "/health", timeout=1.0)
+        if resp.status_code != 200:
+            return None
+        resp = await pool.request(instance_url, "GET", "/inventory")
+        return resp.json()
+    return proxy_pooled
+
+
+async def run(proxy, instance_url, total, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            await proxy(instance_url)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return total / (time.perf_counter() - start)
+
+
+async def main(port, total, concurrency):
+    server, task = await start_stub(port)
+    instance_url = f"http://127.0.0.1:{port}"
+    pool = HTTPClientPool(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    try:
+        print("===== GATEWAY HTTP POOL BENCHMARK =====")
+        print(f"Requests: {total}, concurrency: {concurrency}")
+
+        before = await run(proxy_per_request, instance_url, total, concurrency)
+        print(f"Per-request client: {before:.1f} req/s")
+
+        after = await run(make_pooled_proxy(pool), instance_url, total, concurrency)
+        print(f"Pooled client:      {after:.1f} req/s")
+
+        print(f"Speedup: {after / before:.2f}x")
+    finally:
+        await pool.close()
+        server.should_exit = True
+        await task
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8950)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.port, args.requests, args.concurrency))
@@ -0,0 +1,89 @@
+# Needs a running Hazelcast cluster (hz-start). Uses its own map, so service
+# data is not touched.
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import hazelcast
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from shared.hz_async import AsyncHazelcast
+
+BENCH_MAP = "bench-hz-async-map"
+
+
+# Blocking proxy called from a coroutine, as the services used to do
+def blocking_get(client):
+    map_ = client.get_map(BENCH_MAP).blocking()
+
+    async def get(key):
+        return map_.get(key)
+
+    return get
+
+
+def async_get(hz):
+    map_ = hz.get_map(BENCH_MAP)
+
+    async def get(key):
+        return await map_.get(key)
+
+    return get
+
+
+# Worst gap between event loop ticks while the readers run
+async def measure_loop_lag(stop, interval=0.005):
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+
+async def run(get, concurrency, reads, keys):
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_loop_lag(stop))
+
+    async def reader(worker):
+        for i in range(reads):
+            await get(keys[(worker + i) % len(keys)])
+
+    start = time.perf_counter()
+    await asyncio.gather(*(reader(worker) for worker in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    lag = await lag_task
+    return concurrency * reads / elapsed, lag
+
+
+async def main(args):
+    client = hazelcast.HazelcastClient(cluster_name=args.cluster_name)
+    hz = AsyncHazelcast(client)
+    keys = [f"bench-key-{i}" for i in range(args.keys)]
+    client.get_map(BENCH_MAP).blocking().put_all({key: {"id": key, "value": i} for i, key in enumerate(keys)})
+
+    print("===== HAZELCAST ASYNC ACCESS BENCHMARK =====")
+    print(f"{args.reads} reads per coroutine, {args.keys} keys")
+    print(f"{'concurrency':>11} | {'blocking ops/s':>14} {'max lag ms':>10} | {'async ops/s':>11} {'max lag ms':>10} | speedup")
+    for concurrency in args.concurrency:
+        blocking_rate, blocking_lag = await run(blocking_get(client), concurrency, args.reads, keys)
+        async_rate, async_lag = await run(async_get(hz), concurrency, args.reads, keys)
+        print(f"{concurrency:>11} | {blocking_rate:>14.1f} {blocking_lag * 1000:>10.1f} | "
+              f"{async_rate:>11.1f} {async_lag * 1000:>10.1f} | {async_rate / blocking_rate:.2f}x")
+
+    client.get_map(BENCH_MAP).blocking().destroy()
+    hz.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cluster-name", default="dev")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 128, 512])
+    parser.add_argument("--reads", type=int, default=200)
+    parser.add_argument("--keys", type=int, default=1000)
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
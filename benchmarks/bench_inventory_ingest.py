@@ -0,0 +1,67 @@
+# Needs a running inventory service (and Hazelcast behind it), same as test_inventory.py
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+
+def make_row(i, prefix):
+    return {
+        "id": f"{prefix}-{i}",
+        "name": f"Bench part {i}",
+        "quantity": 10,
+        "available_quantity": 10,
+        "price": 1.99,
+        "category": "bench",
+    }
+
+
+async def ingest_buffered(client, base_url, rows, batch_size, prefix):
+    for start in range(0, rows, batch_size):
+        items = [make_row(i, prefix) for i in range(start, min(rows, start + batch_size))]
+        resp = await client.post(f"{base_url}/log_inventory", json={"items": items})
+        resp.raise_for_status()
+
+
+async def ingest_stream(client, base_url, rows, prefix):
+    async def body():
+        for i in range(rows):
+            yield (json.dumps(make_row(i, prefix)) + "\n").encode()
+
+    resp = await client.post(
+        f"{base_url}/log_inventory/stream",
+        content=body(),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    resp.raise_for_status()
+    return resp.json()
+
+
+async def main(base_url, rows, batch_size):
+    print("===== INVENTORY INGEST BENCHMARK =====")
+    print(f"Rows: {rows}")
+    async with httpx.AsyncClient(timeout=None) as client:
+        start = time.perf_counter()
+        await ingest_buffered(client, base_url, rows, batch_size, "bench-buffered")
+        buffered_rate = rows / (time.perf_counter() - start)
+        print(f"/log_inventory ({batch_size} items per request): {buffered_rate:.1f} rows/s")
+
+        start = time.perf_counter()
+        summary = await ingest_stream(client, base_url, rows, "bench-stream")
+        stream_rate = rows / (time.perf_counter() - start)
+        print(f"/log_inventory/stream (NDJSON):        {stream_rate:.1f} rows/s")
+        print(f"Accepted: {summary['accepted']}, rejected: {summary['rejected']}, not applied: {summary['not_applied']}")
+
+        print(f"Speedup: {stream_rate / buffered_rate:.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:5680")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.url, args.rows, args.batch_size))
@@ -0,0 +1,121 @@
+# Needs a running Hazelcast cluster (hz-start). Uses its own map, so real
+# inventory is not touched.
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+import hazelcast
+from fastapi import HTTPException
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "inventory_service")))
+from inventory_service import InventoryService, encode_item, decode_item
+from shared.schemas import COMPACT_SERIALIZERS
+
+BENCH_MAP = "bench-inventory-map"
+BENCH_RESERVATION_KEYS_MAP = "bench-reservation-keys-map"
+
+
+# Reservation loop as it was before: get + put per part, no locking
+async def legacy_reserve(service, requested_parts):
+    map_ = service.hz.get_map(service.map_name)
+    reserved = {}
+    for part_id, quantity in requested_parts.items():
+        item = decode_item(await map_.get(part_id))
+        if item and item["available_quantity"] >= quantity:
+            item["available_quantity"] -= quantity
+            await map_.put(part_id, encode_item(item))
+            reserved[part_id] = quantity
+    return reserved
+
+
+async def atomic_reserve(service, requested_parts):
+    try:
+        result = await service.check_and_reserve(requested_parts)
+        return result["reserved"]
+    except HTTPException:
+        return {}
+
+
+async def no_reorder(missing_parts):
+    return None
+
+
+def worker(mode, cluster_name, hot_skus, concurrency, reservations, results):
+    async def run():
+        service = InventoryService(cluster_name=cluster_name, queue_name="bench-queue", map_name=BENCH_MAP,
+                                   reservation_keys_map_name=BENCH_RESERVATION_KEYS_MAP)
+        service.publish_missing_parts = no_reorder
+        reserve = legacy_reserve if mode == "legacy" else atomic_reserve
+        reserved_units = 0
+
+        async def reserver():
+            nonlocal reserved_units
+            for _ in range(reservations):
+                parts = random.sample(hot_skus, k=min(2, len(hot_skus)))
+                reserved = await reserve(service, {part: 1 for part in parts})
+                reserved_units += sum(reserved.values())
+
+        await asyncio.gather(*(reserver() for _ in range(concurrency)))
+        await service.shutdown()
+        return reserved_units
+
+    results.put(asyncio.run(run()))
+
+
+def run_mode(mode, args, hot_skus):
+    client = hazelcast.HazelcastClient(cluster_name=args.cluster_name, compact_serializers=COMPACT_SERIALIZERS)
+    map_ = client.get_map(BENCH_MAP).blocking()
+    map_.clear()
+    map_.put_all({
+        sku: encode_item({"id": sku, "name": sku, "quantity": args.stock, "available_quantity": args.stock,
+                          "price": 1.0, "category": "bench"})
+        for sku in hot_skus
+    })
+
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(
+            target=worker,
+            args=(mode, args.cluster_name, hot_skus, args.concurrency, args.reservations, results),
+        )
+        for _ in range(args.processes)
+    ]
+    start = time.perf_counter()
+    for process in processes:
+        process.start()
+    reserved_units = sum(results.get() for _ in processes)
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - start
+
+    remaining = sum(decode_item(item)["available_quantity"] for item in map_.get_all(hot_skus).values())
+    client.shutdown()
+
+    total = args.processes * args.concurrency * args.reservations
+    initial = args.stock * len(hot_skus)
+    oversold = max(0, reserved_units - (initial - remaining))
+    print(f"{mode:>7}: {total / elapsed:8.1f} reservations/s, "
+          f"reserved {reserved_units} units, stock left {remaining}/{initial}, oversold {oversold}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cluster-name", default="dev")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--reservations", type=int, default=50)
+    parser.add_argument("--hot-skus", type=int, default=3)
+    parser.add_argument("--stock", type=int, default=2000)
+    args = parser.parse_args()
+
+    hot_skus = [f"hot-part-{i}" for i in range(args.hot_skus)]
+    print("===== INVENTORY RESERVATION CONTENTION BENCHMARK =====")
+    print(f"{args.processes} processes x {args.concurrency} reservers x {args.reservations} reservations "
+          f"on {args.hot_skus} hot SKUs")
+    run_mode("legacy", args, hot_skus)
+    run_mode("atomic", args, hot_skus)
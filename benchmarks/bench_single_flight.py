@@ -0,0 +1,82 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import uvicorn
+from fastapi import FastAPI
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from shared.http_pool import HTTPClientPool
+from shared.single_flight import SingleFlight
+
+# Stub inventory-service that counts how often it is hit
+stub = FastAPI()
+upstream_calls = {"count": 0}
+
+@stub.get("/inventory")
+async def get_inventory():
+    upstream_calls["count"] += 1
+    await asyncio.sleep(0.02)  # stands in for the per-key Hazelcast reads
+    return {f"part-{i}": {"available_quantity": i} for i in range(20)}
+
+
+async def start_stub(port):
+    config = uvicorn.Config(stub, host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    return server, task
+
+
+async def run(pool, instance_url, single_flight, clients, rounds):
+    async def fetch():
+        resp = await pool.request(instance_url, "GET", "/inventory")
+        return resp.json()
+
+    async def one():
+        if single_flight is None:
+            return await fetch()
+        return await single_flight.do(("inventory", "GET", "/inventory", "", "Bearer token"), fetch)
+
+    upstream_calls["count"] = 0
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await asyncio.gather(*(one() for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+    return upstream_calls["count"], clients * rounds / elapsed
+
+
+async def main(port, clients, rounds):
+    server, task = await start_stub(port)
+    instance_url = f"http://127.0.0.1:{port}"
+    pool = HTTPClientPool(max_connections=clients, max_keepalive_connections=clients)
+
+    try:
+        print("===== GATEWAY SINGLE-FLIGHT BENCHMARK =====")
+        print(f"Concurrent clients: {clients}, rounds: {rounds}")
+
+        calls, rate = await run(pool, instance_url, None, clients, rounds)
+        print(f"Without single-flight: {calls} upstream calls, {rate:.1f} req/s")
+
+        single_flight = SingleFlight()
+        calls_sf, rate_sf = await run(pool, instance_url, single_flight, clients, rounds)
+        print(f"With single-flight:    {calls_sf} upstream calls, {rate_sf:.1f} req/s")
+
+        print(f"Upstream call reduction: {100 * (1 - calls_sf / calls):.1f}%")
+    finally:
+        await pool.close()
+        server.should_exit = True
+        await task
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8951)
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.port, args.clients, args.rounds))
@@ -13,6 +13,66 @@ def main():
         "order-map": "order-map",
         "order-parts-map": "order-parts-map",
         "auth-map":"auth-users-map",
+        "reservation-keys-map": "reservation-keys-map",
+        "gateway-max-connections": "100",
+        "gateway-max-keepalive-connections": "20",
+        "gateway-keepalive-expiry": "30",
+        "gateway-http2": "false",
+        "gateway-health-interval": "5",
+        "gateway-breaker-failures": "3",
+        "gateway-breaker-reset": "10",
+        "gateway-lb-strategy": "round-robin",
+        "gateway-lb-inventory": "p2c-ewma",
+        "gateway-lb-ewma-alpha": "0.3",
+        "gateway-local-jwt": "true",
+        "auth-key-refresh-interval": "60",
+        "auth-bcrypt-rounds": "12",
+        "auth-hash-workers": "0",
+        "auth-hash-max-queue": "256",
+        "auth-stateless-verify": "false",
+        "auth-near-cache-enabled": "true",
+        "auth-near-cache-size": "10000",
+        "auth-near-cache-ttl": "60",
+        "auth-near-cache-eviction": "lru",
+        "gateway-cache-enabled": "true",
+        "gateway-cache-size": "1024",
+        "gateway-cache-ttl": "30",
+        "gateway-single-flight": "true",
+        "gateway-streaming": "false",
+        "gateway-batch-max-items": "50",
+        "gateway-batch-concurrency": "8",
+        "gateway-max-concurrent": "64",
+        "gateway-max-queue": "128",
+        "gateway-queue-timeout": "1",
+        "gateway-user-rate": "20",
+        "gateway-user-burst": "60",
+        "gateway-limits-refresh-interval": "15",
+        "inventory-batch-enabled": "false",
+        "inventory-batch-window-ms": "2",
+        "inventory-batch-max-size": "64",
+        "inventory-near-cache-enabled": "true",
+        "inventory-near-cache-size": "10000",
+        "inventory-near-cache-ttl": "30",
+        "inventory-near-cache-eviction": "lru",
+        "inventory-reservation-key-ttl": "86400",
+        "order-parts-consumers": "2",
+        "order-parts-consumer-batch-size": "100",
+        "order-parts-poll-timeout": "1",
+        "order-parts-max-attempts": "10",
+        "order-parts-flush-interval-ms": "200",
+        "order-parts-flush-max-parts": "500",
+        "orders-async-intake": "false",
+        "orders-intake-queue": "order-intake-queue",
+        "orders-intake-workers": "4",
+        "orders-intake-batch-size": "32",
+        "orders-intake-poll-timeout": "1",
+        "orders-intake-max-attempts": "10",
+        "repairs-async-intake": "false",
+        "repairs-intake-queue": "repair-intake-queue",
+        "repairs-intake-workers": "4",
+        "repairs-intake-batch-size": "32",
+        "repairs-intake-poll-timeout": "1",
+        "repairs-intake-max-attempts": "10",
     }
 
     for key, value in kvs.items():
@@ -3,72 +3,351 @@
 # python .\inventory_service\inventory_service.py --port 8006
 
 import argparse
+from typing import Optional
+import asyncio
+import codecs
+import json
+import re
 from fastapi import FastAPI, HTTPException, Request
 import httpx
 import hazelcast
+from hazelcast import predicate
+from hazelcast.config import IndexType
 import os, sys
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 import uvicorn
 from fastapi.middleware.cors import CORSMiddleware
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from shared.consul_utils import register_service, deregister_service, fetch_instances, get_consul_kv
-
-class InventoryItem(BaseModel):
-    id: str
-    name: str
-    quantity: int
-    available_quantity: int
-    price: float
-    category: str = "General"
+from shared.consul_utils import register_service, deregister_service, get_consul_kv, get_consul_setting, ServiceWatcher
+from shared.listing import list_entries
+from shared.hz_locks import MapKeyLocks, LockTimeout
+from shared.hz_async import AsyncHazelcast
+from shared.near_cache import NearCache
+from shared.schemas import InventoryItem, Reservation, COMPACT_SERIALIZERS, to_record
 
 class InventoryLogRequest(BaseModel):
     items: list[InventoryItem]
 
+class InventoryBatchGetRequest(BaseModel):
+    ids: list[str]
+
+#key makes a retried reservation return its first result instead of reserving twice
+class ReservationRequest(BaseModel):
+    items: dict[str, int]
+    partial: bool = False
+    key: Optional[str] = None
+
+class ReservationBatchRequest(BaseModel):
+    requests: list[ReservationRequest]
+
+MAX_BATCH_GET_IDS = 1000
+MAX_RESERVATION_BATCH = 1000
+INGEST_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+#Indexed item fields used by GET /inventory/search
+INVENTORY_INDEXES = [
+    (["category"], IndexType.HASH),
+    (["available_quantity"], IndexType.SORTED),
+    (["price"], IndexType.SORTED),
+]
+
+#Items are stored as Compact InventoryItem records, so the cluster can index
+#and query their fields; the service works on plain dicts. Values in older
+#formats are still readable until migrate_maps.py rewrites them.
+def encode_item(item: dict):
+    return InventoryItem(**item)
+
+def decode_item(value):
+    if value is None:
+        return None
+    return to_record(InventoryItem, value).dict()
+
+#Rows of an NDJSON body, one JSON document per line
+async def iter_ndjson_rows(chunks):
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    buffer += decoder.decode(b"", final=True)
+    if buffer.strip():
+        yield buffer
+
+#An array element that is not valid JSON; ingest_rows reports it as a row error
+class InvalidRow:
+    def __init__(self, error):
+        self.error = error
+
+# Next character that can end an element or change nesting, outside / inside a string
+ELEMENT_SCAN = re.compile(r'[\[\]{},"]')
+STRING_SCAN = re.compile(r'["\\]')
+
+#Elements of a (possibly chunked) top-level JSON array. Each element is cut at
+#the next top-level "," or "]" before it is decoded, so an element split across
+#chunks waits for the rest, and a malformed one is yielded as InvalidRow while
+#the rows after it are still read.
+async def iter_json_array_rows(chunks):
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    started = False
+    finished = False
+    # Scan state of the current element, kept between chunks
+    scan = 0
+    depth = 0
+    in_string = False
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        while not finished:
+            if not started:
+                buffer = buffer.lstrip(" \t\r\n")
+                if not buffer:
+                    break
+                if buffer[0] != "[":
+                    raise ValueError("Expected a JSON array")
+                started = True
+                buffer = buffer[1:]
+
+            boundary = None
+            while boundary is None:
+                match = (STRING_SCAN if in_string else ELEMENT_SCAN).search(buffer, scan)
+                if match is None:
+                    scan = len(buffer)
+                    break
+                char, scan = match.group(), match.end()
+                if in_string:
+                    if char == '"':
+                        in_string = False
+                    elif scan < len(buffer):
+                        scan += 1  # escaped character
+                    else:
+                        scan -= 1  # rescan the backslash once the next chunk is in
+                        break
+                elif char == '"':
+                    in_string = True
+                elif char in "[{":
+                    depth += 1
+                elif depth > 0:
+                    if char in "]}":
+                        depth -= 1
+                elif char in ",]":
+                    boundary = scan - 1
+            if boundary is None:
+                break
+
+            element, terminator = buffer[:boundary].strip(), buffer[boundary]
+            buffer = buffer[boundary + 1:]
+            scan = 0
+            if element:
+                try:
+                    yield json.loads(element)
+                except json.JSONDecodeError as e:
+                    yield InvalidRow(f"Invalid JSON element: {e}")
+            elif terminator == ",":
+                yield InvalidRow("Empty array element")
+            finished = terminator == "]"
+    if not finished:
+        raise ValueError("Unterminated JSON array")
+
+#Takes parts from `items` (part id -> stored item) in place and reports what is short
+def allocate(items: dict, requested_parts: dict, partial: bool):
+    reserved = {}
+    missing_parts = {}
+    for part_id, quantity in requested_parts.items():
+        item = items.get(part_id)
+        available = item["available_quantity"] if item else 0
+        if item and available >= quantity:
+            reserved[part_id] = quantity
+        else:
+            missing_parts[part_id] = quantity - available
+            if partial and available > 0:
+                reserved[part_id] = available
+
+    if missing_parts and not partial:
+        reserved = {}
+    for part_id, quantity in reserved.items():
+        items[part_id]["available_quantity"] -= quantity
+    return reserved, missing_parts
+
+class ReservationBatcher:
+    # Collects reservations arriving within `window` seconds (or until
+    # `max_batch` are waiting) and applies them with one bulk Hazelcast
+    # operation. Requests are served in arrival order, and each caller gets
+    # its own (reserved, missing) result.
+    def __init__(self, service, window=0.002, max_batch=64):
+        self.service = service
+        self.window = window
+        self.max_batch = max_batch
+        self.pending = []
+        self.timer = None
+        self.batches = 0
+        self.requests = 0
+
+    async def submit(self, requested_parts: dict, partial: bool):
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((requested_parts, partial, future))
+        if len(self.pending) >= self.max_batch:
+            self._flush_now()
+        elif self.timer is None:
+            self.timer = asyncio.get_running_loop().call_later(self.window, self._flush_now)
+        return await future
+
+    def _flush_now(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        batch, self.pending = self.pending, []
+        if batch:
+            asyncio.ensure_future(self.flush(batch))
+
+    async def flush(self, batch):
+        self.batches += 1
+        self.requests += len(batch)
+        try:
+            results = await self.service.reserve_many([(parts, partial) for parts, partial, _ in batch])
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, _, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self):
+        return {
+            "window_ms": self.window * 1000,
+            "max_batch": self.max_batch,
+            "batches": self.batches,
+            "requests": self.requests,
+            "avg_batch_size": round(self.requests / self.batches, 2) if self.batches else 0.0,
+        }
+
 class InventoryService:
-    def __init__(self, cluster_name, queue_name, map_name, service_name="inventory-service"):
-        self.hz_client = hazelcast.HazelcastClient(cluster_name=cluster_name)
+    def __init__(self, cluster_name, queue_name, map_name, reservation_keys_map_name,
+                 reservation_key_ttl=86400.0, service_name="inventory-service"):
+        self.hz_client = hazelcast.HazelcastClient(cluster_name=cluster_name, compact_serializers=COMPACT_SERIALIZERS)
+        self.hz = AsyncHazelcast(self.hz_client)
         self.service_name = service_name
         self.map_name = map_name
-        self.msg_queue = self.hz_client.get_queue(queue_name)
+        self.reservation_keys = self.hz.get_map(reservation_keys_map_name)
+        self.reservation_key_ttl = reservation_key_ttl
+        self.msg_queue = self.hz.get_queue(queue_name)
         self.service_id = f"{service_name}-{os.getpid()}"
         self.order_parts_service_instances = []
+        self.key_locks = MapKeyLocks()
+        self.batcher = None
+        self.near_cache = None
+        self.order_parts_service_watcher = ServiceWatcher("order-parts-service", on_change=self.set_order_parts_service_instances)
+
+    #Adding an index that already exists is a no-op on the cluster
+    async def ensure_indexes(self):
+        map_ = self.hz.get_map(self.map_name)
+        for attributes, index_type in INVENTORY_INDEXES:
+            await map_.add_index(attributes=attributes, index_type=index_type)
+
+    def set_order_parts_service_instances(self, instances):
+        self.order_parts_service_instances = instances
 
-    async def fetch_service_addresses(self):
-        order_parts_instances = await fetch_instances("order-parts-service")
+    #Opt-in micro-batching of concurrent /reserve_inventory calls
+    def enable_reservation_batching(self, window, max_batch):
+        self.batcher = ReservationBatcher(self, window=window, max_batch=max_batch)
 
-        print(order_parts_instances)
+    #Serves GET /inventory/{product_id} for hot parts from process memory
+    async def enable_near_cache(self, max_size, ttl, eviction):
+        self.near_cache = NearCache(max_size=max_size, ttl=ttl, eviction=eviction)
+        await self.near_cache.listen(self.hz.get_map(self.map_name), self.hz_client.lifecycle_service)
 
-        if order_parts_instances:
-            self.order_parts_service_instances = order_parts_instances
-            return True
+    #Drops keys this process just wrote, before their entry events arrive
+    def invalidate_near_cache(self, keys):
+        if self.near_cache is not None:
+            self.near_cache.invalidate(keys)
 
-        return False
+    #Consul blocking-query watcher keeps order-parts-service instances fresh
+    async def watch_service_addresses(self):
+        await self.order_parts_service_watcher.start()
     
-    async def check_and_reserve(self, requested_parts: dict):
-        map_ = self.hz_client.get_map(self.map_name).blocking()
-        missing_parts = {}
-
-        for part_id, quantity in requested_parts.items():
-            item = map_.get(part_id)
-            print(item)
-            if item and item["available_quantity"] >= quantity:
-                item["available_quantity"] -= quantity
-                map_.put(part_id, item)
-            else:
-                missing_parts[part_id] = quantity - (item["available_quantity"] if item else 0)
-                if item:
-                    item["available_quantity"] = 0
-                    map_.put(part_id, item)
+    #Reserves parts for one request, or a micro-batch of them when the batcher is on
+    async def check_and_reserve(self, requested_parts: dict, partial: bool = False):
+        if self.batcher is not None:
+            reserved, missing_parts = await self.batcher.submit(requested_parts, partial)
+        else:
+            [(reserved, missing_parts)] = await self.reserve_many([(requested_parts, partial)])
+
+        if missing_parts and not partial:
+            raise HTTPException(
+                status_code=409,
+                detail={"message": "Not enough parts in stock", "reserved": {}, "missing": missing_parts},
+            )
+        return {"reserved": reserved, "missing": missing_parts}
+
+    #Applies reservations in order under key locks with one get_all and one put_all.
+    #Each request is all-or-nothing unless partial, which reserves what is available.
+    #Requests with an idempotency key (idempotency_keys[i]) that was already
+    #applied get the stored result and change nothing.
+    async def reserve_many(self, requests: list, idempotency_keys: Optional[list] = None):
+        map_ = self.hz.get_map(self.map_name)
+        keys = {part_id for requested_parts, _ in requests for part_id in requested_parts}
+        idempotency_keys = idempotency_keys or [None] * len(requests)
+        results = []
+        all_missing = {}
 
-        if missing_parts:
+        try:
+            # The item locks also cover the idempotency keys: a retry locks the same parts
+            async with self.key_locks.locked(map_, keys):
+                given_keys = list({key for key in idempotency_keys if key is not None})
+                applied = await self.reservation_keys.get_all(given_keys) if given_keys else {}
+                items = {part_id: decode_item(value) for part_id, value in (await map_.get_all(list(keys))).items()}
+                touched = set()
+                new_results = {}
+                for (requested_parts, partial), key in zip(requests, idempotency_keys):
+                    previous = applied.get(key) or new_results.get(key)
+                    if previous is not None:
+                        results.append((previous.reserved, previous.missing))
+                        continue
+                    reserved, missing_parts = allocate(items, requested_parts, partial)
+                    touched.update(reserved)
+                    results.append((reserved, missing_parts))
+                    if key is not None:
+                        new_results[key] = Reservation(reserved=reserved, missing=missing_parts)
+                    for part_id, quantity in missing_parts.items():
+                        all_missing[part_id] = all_missing.get(part_id, 0) + quantity
+                if touched:
+                    await map_.put_all({part_id: encode_item(items[part_id]) for part_id in touched})
+                    self.invalidate_near_cache(touched)
+                await asyncio.gather(*(
+                    self.reservation_keys.set(key, result, self.reservation_key_ttl)
+                    for key, result in new_results.items()
+                ))
+        except LockTimeout as e:
+            print("Reservation lock timeout:", e)
+            raise HTTPException(status_code=409, detail="Inventory is busy, retry the reservation")
+
+        if all_missing:
             print("Missing parts detected")
-            print(missing_parts)
-            await self.send_missing_to_order_service(missing_parts)
+            print(all_missing)
+            await self.publish_missing_parts(all_missing)
 
-        return {"reserved": requested_parts, "missing": missing_parts}
+        return results
 
     
+    #Reorders go to order-parts-service over the Hazelcast queue, so the
+    #reservation does not wait on (or lose) an HTTP call. Direct HTTP is only
+    #the fallback when the event cannot be queued.
+    async def publish_missing_parts(self, missing_parts: dict):
+        event = {"type": "missing_parts", "parts": missing_parts, "source": self.service_id}
+        try:
+            if await self.msg_queue.offer(event):
+                return
+            print("Reorder queue is full")
+        except Exception as e:
+            print("Failed to queue missing parts:", e)
+        await self.send_missing_to_order_service(missing_parts)
+
     async def send_missing_to_order_service(self, missing_parts: dict):
         if not self.order_parts_service_instances:
             print("Order-parts service not available")
@@ -86,21 +365,140 @@ class InventoryService:
             except Exception as e:
                 print("Failed to send missing parts:", e)
 
-    async def get_inventory(self):
-        map_ = self.hz_client.get_map(self.map_name).blocking()
-        all_keys = map_.key_set()
-        inventory = {key: map_.get(key) for key in all_keys}
-        return inventory
+    async def get_inventory(self, limit: Optional[int] = None, cursor: Optional[str] = None, format: str = "json"):
+        map_ = self.hz.get_map(self.map_name)
+        return await list_entries(map_, limit, cursor, format, decode=decode_item)
+
+    #Filters run on the cluster against the item indexes; paging is the same as GET /inventory
+    async def search_inventory(self, category: Optional[str] = None, min_available: Optional[int] = None,
+                               max_available: Optional[int] = None, min_price: Optional[float] = None,
+                               max_price: Optional[float] = None, limit: Optional[int] = None,
+                               cursor: Optional[str] = None, format: str = "json"):
+        conditions = []
+        if category is not None:
+            conditions.append(predicate.equal("category", category))
+        if min_available is not None:
+            conditions.append(predicate.greater_or_equal("available_quantity", min_available))
+        if max_available is not None:
+            conditions.append(predicate.less_or_equal("available_quantity", max_available))
+        if min_price is not None:
+            conditions.append(predicate.greater_or_equal("price", min_price))
+        if max_price is not None:
+            conditions.append(predicate.less_or_equal("price", max_price))
+        condition = predicate.and_(*conditions) if conditions else None
+
+        map_ = self.hz.get_map(self.map_name)
+        return await list_entries(map_, limit, cursor, format, condition=condition, decode=decode_item)
+
+    #Several items in one get_all round trip; unknown ids are listed separately
+    async def get_inventory_items(self, product_ids: list[str]):
+        if len(product_ids) > MAX_BATCH_GET_IDS:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_GET_IDS} ids per request")
+        map_ = self.hz.get_map(self.map_name)
+        unique_ids = list(dict.fromkeys(product_ids))
+        items = {product_id: decode_item(value) for product_id, value in (await map_.get_all(unique_ids)).items()}
+        missing = [product_id for product_id in unique_ids if product_id not in items]
+        return {"items": items, "missing": missing}
+
+    #Adds quantities to existing items (or creates them) with one get_all and one put_all
+    async def merge_items(self, items: list[InventoryItem]):
+        map_ = self.hz.get_map(self.map_name)
+        merged = {}
+        for item in items:
+            if item.id in merged:
+                merged[item.id]["quantity"] += item.quantity
+                merged[item.id]["available_quantity"] += item.available_quantity
+            else:
+                merged[item.id] = item.dict()
+
+        #Same key locks as reservations, so neither overwrites the other's update
+        try:
+            async with self.key_locks.locked(map_, merged):
+                existing = await map_.get_all(list(merged))
+                for item_id, value in existing.items():
+                    current = decode_item(value)
+                    current["quantity"] += merged[item_id]["quantity"]
+                    current["available_quantity"] += merged[item_id]["available_quantity"]
+                    merged[item_id] = current
+                await map_.put_all({item_id: encode_item(item) for item_id, item in merged.items()})
+                self.invalidate_near_cache(merged)
+        except LockTimeout as e:
+            print("Inventory update lock timeout:", e)
+            raise HTTPException(status_code=409, detail="Inventory is busy, retry the update")
+
+    #Validates rows as they arrive and merges them chunk by chunk. A chunk that
+    #cannot be merged (e.g. the items are locked) is reported with its row range
+    #and skipped; earlier chunks stay applied, so only those rows need resending.
+    async def ingest_rows(self, rows, chunk_size: int = INGEST_CHUNK_SIZE):
+        summary = {"rows": 0, "accepted": 0, "rejected": 0, "not_applied": 0, "errors": []}
+        chunk = []
+        chunk_rows = []
+
+        def add_error(row_number, error):
+            summary["rejected"] += 1
+            if len(summary["errors"]) < MAX_REPORTED_ERRORS:
+                summary["errors"].append({"row": row_number, "error": error})
+
+        async def apply_chunk():
+            try:
+                await self.merge_items(chunk)
+            except HTTPException as e:
+                summary["not_applied"] += len(chunk)
+                if len(summary["errors"]) < MAX_REPORTED_ERRORS:
+                    summary["errors"].append({"rows": [chunk_rows[0], chunk_rows[-1]], "error": f"Not applied: {e.detail}"})
+                return
+            summary["accepted"] += len(chunk)
+
+        try:
+            async for row in rows:
+                summary["rows"] += 1
+                try:
+                    if isinstance(row, InvalidRow):
+                        raise ValueError(row.error)
+                    if isinstance(row, str):
+                        row = json.loads(row)
+                    chunk.append(InventoryItem(**row))
+                    chunk_rows.append(summary["rows"])
+                except ValidationError as e:
+                    add_error(summary["rows"], "; ".join(
+                        f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()
+                    ))
+                    continue
+                except (ValueError, TypeError) as e:
+                    add_error(summary["rows"], str(e))
+                    continue
+                if len(chunk) >= chunk_size:
+                    await apply_chunk()
+                    chunk = []
+                    chunk_rows = []
+        except ValueError as e:
+            # The body itself is malformed; rows read so far are still applied
+            add_error(summary["rows"] + 1, str(e))
+
+        if chunk:
+            await apply_chunk()
+        return summary
+
     async def get_inventory_instance(self, product_id: str):
-        map_ = self.hz_client.get_map(self.map_name).blocking()
-        quantity = map_.get(product_id)
-        if quantity is None:
+        if self.near_cache is not None:
+            item = self.near_cache.get(product_id)
+            if item is not None:
+                return {product_id: item}
+            generation = self.near_cache.generation()
+
+        map_ = self.hz.get_map(self.map_name)
+        item = await map_.get(product_id)
+        if item is None:
             raise HTTPException(status_code=404, detail="Product not found")
-        return {product_id: quantity}
+        item = decode_item(item)
+        if self.near_cache is not None:
+            self.near_cache.put(product_id, item, generation)
+        return {product_id: item}
 
 
-    def shutdown(self):
-        self.hz_client.shutdown()
+    async def shutdown(self):
+        await self.order_parts_service_watcher.stop()
+        self.hz.shutdown()
         print("Hazelcast client shutdown")
 
 
@@ -122,51 +520,104 @@ async def startup_event():
     cluster_name_ = await get_consul_kv("cluster-name")
     queue_name_ = await get_consul_kv("queue-name")
     map_name_ = await get_consul_kv("inventory-map")
-    inventory_service = InventoryService(cluster_name=cluster_name_, queue_name = queue_name_, map_name=map_name_)
+    reservation_keys_map_name_ = await get_consul_kv("reservation-keys-map")
+    inventory_service = InventoryService(
+        cluster_name=cluster_name_, queue_name = queue_name_, map_name=map_name_,
+        reservation_keys_map_name=reservation_keys_map_name_,
+        reservation_key_ttl=await get_consul_setting("inventory-reservation-key-ttl", 86400.0),
+    )
+    if await get_consul_setting("inventory-batch-enabled", False):
+        inventory_service.enable_reservation_batching(
+            window=await get_consul_setting("inventory-batch-window-ms", 2.0) / 1000,
+            max_batch=await get_consul_setting("inventory-batch-max-size", 64),
+        )
+    if await get_consul_setting("inventory-near-cache-enabled", True):
+        await inventory_service.enable_near_cache(
+            max_size=await get_consul_setting("inventory-near-cache-size", 10000),
+            ttl=await get_consul_setting("inventory-near-cache-ttl", 30.0),
+            eviction=await get_consul_setting("inventory-near-cache-eviction", "lru"),
+        )
+    await inventory_service.ensure_indexes()
     port = int(os.environ["APP_PORT"])
     await register_service(inventory_service.service_name, inventory_service.service_id, "localhost", port)
-    await inventory_service.fetch_service_addresses()
+    await inventory_service.watch_service_addresses()
 
 @app.on_event("shutdown")
 async def shutdown():
     await deregister_service(inventory_service.service_id)
-    inventory_service.shutdown()
+    await inventory_service.shutdown()
     print("Inventory Service shutdown")
 
 @app.get("/health")
 async def health_check():
     return {"status": "OK"}
 
+@app.get("/stats")
+async def get_stats():
+    return {
+        "reservation_batching": inventory_service.batcher.stats() if inventory_service.batcher else None,
+        "near_cache": inventory_service.near_cache.stats() if inventory_service.near_cache else None,
+    }
+
 # -------------- INVENTORY ENDPOINTS ---------------
 @app.post("/log_inventory")
 async def log_inventory(data: InventoryLogRequest):
     print("Received payload:", data)  # Add this line for logging
     
-    map_ = inventory_service.hz_client.get_map(inventory_service.map_name).blocking()
-    for item in data.items:
-        existing = map_.get(item.id)
-        if existing:
-            existing["quantity"] += item.quantity
-            existing["available_quantity"] += item.available_quantity
-            map_.put(item.id, existing)
-        else:
-            map_.put(item.id, item.dict())
+    await inventory_service.merge_items(data.items)
     
     # Ensure you're returning a JSON-serializable response
     return {"status": "inventory updated", "added": [item.id for item in data.items]}
 
+#Bulk ingest: NDJSON (application/x-ndjson) or a JSON array of items, read as it streams in
+@app.post("/log_inventory/stream")
+async def log_inventory_stream(request: Request):
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type:
+        rows = iter_ndjson_rows(request.stream())
+    elif "json" in content_type:
+        rows = iter_json_array_rows(request.stream())
+    else:
+        raise HTTPException(status_code=415, detail="Send application/x-ndjson or a JSON array")
+    summary = await inventory_service.ingest_rows(rows)
+    return {"status": "inventory updated", **summary}
+
 @app.post("/reserve_inventory")
 async def reserve_inventory(request: Request):
     data = await request.json()
     print(data)
     requested_parts = data.get("items", {})
     print(requested_parts)
-    return await inventory_service.check_and_reserve(requested_parts)
+    return await inventory_service.check_and_reserve(requested_parts, partial=data.get("partial", False))
 
+#Many reservations (e.g. queued orders) applied in order with one locked bulk read and write.
+#Each gets its own result; a failed all-or-nothing request is reported, not raised.
+@app.post("/reserve_inventory/batch")
+async def reserve_inventory_batch(data: ReservationBatchRequest):
+    if len(data.requests) > MAX_RESERVATION_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_RESERVATION_BATCH} reservations per request")
+    results = await inventory_service.reserve_many(
+        [(request.items, request.partial) for request in data.requests],
+        [request.key for request in data.requests],
+    )
+    return {"results": [{"reserved": reserved, "missing": missing} for reserved, missing in results]}
 
 @app.get("/inventory")
-async def get_inventory(request: Request):
-    return await inventory_service.get_inventory()
+async def get_inventory(request: Request, limit: Optional[int] = None, cursor: Optional[str] = None, format: str = "json"):
+    return await inventory_service.get_inventory(limit, cursor, format)
+
+#Declared before /inventory/{product_id} so "search" is not taken as an id
+@app.get("/inventory/search")
+async def search_inventory(category: Optional[str] = None, min_available: Optional[int] = None,
+                           max_available: Optional[int] = None, min_price: Optional[float] = None,
+                           max_price: Optional[float] = None, limit: Optional[int] = None,
+                           cursor: Optional[str] = None, format: str = "json"):
+    return await inventory_service.search_inventory(category, min_available, max_available, min_price,
+                                                    max_price, limit, cursor, format)
+
+@app.post("/inventory/batch_get")
+async def batch_get_inventory(data: InventoryBatchGetRequest):
+    return await inventory_service.get_inventory_items(data.ids)
 
 @app.get("/inventory/{product_id}")
 async def get_inventory_item(product_id: str, request: Request):
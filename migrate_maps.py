@@ -0,0 +1,100 @@
+#hz-start
+#consul agent -dev
+# python migrate_maps.py [--dry-run] [--maps inventory-map auth-map]
+#
+# Rewrites values stored in older formats (pickled dicts, JSON values, JSON
+# strings) as Compact records from shared/schemas.py. Safe to run while the
+# services are up: entries changed meanwhile are skipped, and the services
+# already write them as records.
+
+import argparse
+
+import consul
+import hazelcast
+from hazelcast import predicate
+
+from shared.schemas import COMPACT_SERIALIZERS, InventoryItem, Order, OrderPart, Repair, UserInDB, to_record
+
+# Consul key holding the map name -> record types stored in that map, newest
+# first. Orders and repairs written before they had ids were one OrderPart
+# entry per part; those are kept as OrderPart records.
+MAP_RECORDS = {
+    "inventory-map": (InventoryItem,),
+    "auth-map": (UserInDB,),
+    "order-map": (Order, OrderPart),
+    "repairs-map": (Repair, OrderPart),
+    "order-parts-map": (OrderPart,),
+}
+
+PAGE_SIZE = 1000
+
+
+def iter_entries(map_):
+    cursor = None
+    while True:
+        condition = predicate.true() if cursor is None else predicate.greater("__key", cursor)
+        page = sorted(map_.entry_set(predicate.paging(condition, PAGE_SIZE)), key=lambda entry: entry[0])
+        yield from page
+        if len(page) < PAGE_SIZE:
+            return
+        cursor = page[-1][0]
+
+
+def convert(models, value):
+    for model in models:
+        try:
+            return to_record(model, value)
+        except (ValueError, TypeError) as e:
+            error = e
+    raise error
+
+
+def migrate_map(map_, models, dry_run=False):
+    counts = {"migrated": 0, "up_to_date": 0, "changed": 0, "failed": 0}
+    for key, value in iter_entries(map_):
+        if isinstance(value, models):
+            counts["up_to_date"] += 1
+            continue
+        try:
+            record = convert(models, value)
+        except (ValueError, TypeError) as e:
+            print(f"  {key}: cannot convert {value!r}: {e}")
+            counts["failed"] += 1
+            continue
+        if dry_run or map_.replace_if_same(key, value, record):
+            counts["migrated"] += 1
+        else:
+            counts["changed"] += 1
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--maps", nargs="+", choices=sorted(MAP_RECORDS), default=sorted(MAP_RECORDS))
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    c = consul.Consul(host='localhost', port=8500)
+    _, cluster_name = c.kv.get("cluster-name")
+    client = hazelcast.HazelcastClient(
+        cluster_name=cluster_name["Value"].decode(),
+        compact_serializers=COMPACT_SERIALIZERS,
+    )
+
+    for kv_key in args.maps:
+        _, entry = c.kv.get(kv_key)
+        if entry is None:
+            print(f"{kv_key} is not set in Consul, skipping")
+            continue
+        map_name = entry["Value"].decode()
+        models = MAP_RECORDS[kv_key]
+        print(f"Migrating {map_name} to {models[0].__name__}{' (dry run)' if args.dry_run else ''}")
+        counts = migrate_map(client.get_map(map_name).blocking(), models, args.dry_run)
+        print(f"  migrated {counts['migrated']}, already compact {counts['up_to_date']}, "
+              f"changed meanwhile {counts['changed']}, failed {counts['failed']}")
+
+    client.shutdown()
+    print("Migration finished.")
+
+if __name__ == "__main__":
+    main()
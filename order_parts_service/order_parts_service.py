@@ -3,7 +3,8 @@
 # python .\inventory_service\inventory_service.py --port 8006
 
 import argparse
-from typing import Dict
+import asyncio
+from typing import Dict, Optional
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 import httpx
@@ -13,31 +14,159 @@ from pydantic import BaseModel
 import uvicorn
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from shared.consul_utils import register_service, deregister_service, fetch_instances, get_consul_kv
-
-class OrderPart(BaseModel):
-    id: str
-    quantity: int
+from shared.consul_utils import register_service, deregister_service, fetch_instances, get_consul_kv, get_consul_setting
+from shared.listing import list_entries
+from shared.hz_async import AsyncHazelcast
+from shared.schemas import OrderPart, COMPACT_SERIALIZERS, to_record, to_plain
+from shared.hz_locks import MapKeyLocks, LockTimeout
+from shared.queue_workers import QueueWorkerPool
 
 class OrderPartsRequest(BaseModel):
     parts: list[OrderPart]
 
+#Parts of a missing_parts event, or None when the event is not one
+def reorder_event_parts(event):
+    if not isinstance(event, dict) or event.get("type") != "missing_parts":
+        return None
+    parts = event.get("parts")
+    if not isinstance(parts, dict) or not parts:
+        return None
+    for part_id, quantity in parts.items():
+        if not isinstance(part_id, str) or isinstance(quantity, bool) or not isinstance(quantity, int) or quantity <= 0:
+            return None
+    return parts
+
+class ReorderAggregator:
+    # Merges shortages per part for `interval` seconds (or until `max_parts`
+    # distinct parts are pending) and applies them with one locked bulk
+    # update, so a run on a hot part becomes one write per flush instead of
+    # one per shortage. Callers wait for the flush that carries their parts.
+    def __init__(self, service, interval=0.2, max_parts=500):
+        self.service = service
+        self.interval = interval
+        self.max_parts = max_parts
+        self.pending = {}
+        self.waiters = []
+        self.timer = None
+        self.flushes = 0
+        self.submissions = 0
+        self.lines = 0
+
+    async def submit(self, parts: dict):
+        future = asyncio.get_running_loop().create_future()
+        for part_id, quantity in parts.items():
+            self.pending[part_id] = self.pending.get(part_id, 0) + quantity
+        self.waiters.append(future)
+        if len(self.pending) >= self.max_parts:
+            self._flush_now()
+        elif self.timer is None:
+            self.timer = asyncio.get_running_loop().call_later(self.interval, self._flush_now)
+        return await future
+
+    def _flush_now(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        parts, self.pending = self.pending, {}
+        waiters, self.waiters = self.waiters, []
+        if waiters:
+            asyncio.ensure_future(self.flush(parts, waiters))
+
+    async def flush(self, parts, waiters):
+        self.flushes += 1
+        self.submissions += len(waiters)
+        try:
+            totals = await self.service.add_parts(parts)
+        except Exception as e:
+            for future in waiters:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.lines += len(parts)
+        print("Purchase lines:", [
+            {"id": part_id, "quantity": quantity, "total": totals[part_id].quantity}
+            for part_id, quantity in sorted(parts.items())
+        ])
+        for future in waiters:
+            if not future.done():
+                future.set_result(None)
+
+    def stats(self):
+        return {
+            "interval_ms": self.interval * 1000,
+            "max_parts": self.max_parts,
+            "flushes": self.flushes,
+            "submissions": self.submissions,
+            "purchase_lines": self.lines,
+            "avg_submissions_per_flush": round(self.submissions / self.flushes, 2) if self.flushes else 0.0,
+        }
+
 class OrderPartsService:
     def __init__(self, cluster_name, queue_name, map_name, service_name="order-parts-service"):
-        self.hz_client = hazelcast.HazelcastClient(cluster_name=cluster_name)
+        self.hz_client = hazelcast.HazelcastClient(cluster_name=cluster_name, compact_serializers=COMPACT_SERIALIZERS)
+        self.hz = AsyncHazelcast(self.hz_client)
         self.service_name = service_name
         self.map_name = map_name
-        self.msg_queue = self.hz_client.get_queue(queue_name)
+        self.msg_queue = self.hz.get_queue(queue_name)
         self.service_id = f"{service_name}-{os.getpid()}"
-
-    async def get_order_parts(self):
-        map_ = self.hz_client.get_map(self.map_name).blocking()
-        all_keys = map_.key_set()
-        order_parts = {key: map_.get(key) for key in all_keys}
-        return order_parts
-
-    def shutdown(self):
-        self.hz_client.shutdown()
+        self.key_locks = MapKeyLocks()
+        self.consumers = None
+        self.aggregator = None
+
+    async def get_order_parts(self, limit: Optional[int] = None, cursor: Optional[str] = None, format: str = "json"):
+        map_ = self.hz.get_map(self.map_name)
+        return await list_entries(map_, limit, cursor, format, decode=to_plain)
+
+    #Missing-part events published by inventory-service, drained in batches
+    def start_consumers(self, workers, batch_size, poll_timeout, max_attempts):
+        self.consumers = QueueWorkerPool(
+            self.msg_queue, self.apply_reorder_events, workers=workers, batch_size=batch_size,
+            poll_timeout=poll_timeout, max_attempts=max_attempts,
+        )
+        self.consumers.start()
+
+    #Merges a batch of events into one update; the pool requeues them if it fails.
+    #Malformed events are skipped here, so they cannot fail the batch forever.
+    async def apply_reorder_events(self, events: list):
+        parts = {}
+        for event in events:
+            event_parts = reorder_event_parts(event)
+            if event_parts is None:
+                print("Skipping invalid queue event:", event)
+                continue
+            for part_id, quantity in event_parts.items():
+                parts[part_id] = parts.get(part_id, 0) + quantity
+        if parts:
+            await self.order_parts(parts)
+
+    def enable_aggregation(self, interval, max_parts):
+        self.aggregator = ReorderAggregator(self, interval=interval, max_parts=max_parts)
+
+    #Shortages from the queue and POST /order, aggregated per flush window when enabled
+    async def order_parts(self, parts: dict):
+        if self.aggregator is not None:
+            await self.aggregator.submit(parts)
+        else:
+            await self.add_parts(parts)
+
+    #Adds ordered quantities per part with one locked get_all and put_all
+    async def add_parts(self, parts: dict):
+        map_ = self.hz.get_map(self.map_name)
+        async with self.key_locks.locked(map_, parts):
+            existing = await map_.get_all(list(parts))
+            updated = {}
+            for part_id, quantity in parts.items():
+                current = to_record(OrderPart, existing.get(part_id))
+                if current:
+                    quantity += current.quantity
+                updated[part_id] = OrderPart(id=part_id, quantity=quantity)
+            await map_.put_all(updated)
+        return updated
+
+    async def shutdown(self):
+        if self.consumers:
+            await self.consumers.stop()
+        self.hz.shutdown()
         print("Hazelcast client shutdown")
 
 
@@ -62,34 +191,53 @@ async def startup_event():
     order_parts_service = OrderPartsService(cluster_name=cluster_name_, queue_name = queue_name_, map_name=map_name_)
     port = int(os.environ["APP_PORT"])
     await register_service(order_parts_service.service_name, order_parts_service.service_id, "localhost", port)
+    flush_interval = await get_consul_setting("order-parts-flush-interval-ms", 200.0)
+    if flush_interval > 0:
+        order_parts_service.enable_aggregation(
+            interval=flush_interval / 1000,
+            max_parts=await get_consul_setting("order-parts-flush-max-parts", 500),
+        )
+    order_parts_service.start_consumers(
+        workers=await get_consul_setting("order-parts-consumers", 2),
+        batch_size=await get_consul_setting("order-parts-consumer-batch-size", 100),
+        poll_timeout=await get_consul_setting("order-parts-poll-timeout", 1.0),
+        max_attempts=await get_consul_setting("order-parts-max-attempts", 10),
+    )
 
 @app.on_event("shutdown")
 async def shutdown():
     await deregister_service(order_parts_service.service_id)
-    order_parts_service.shutdown()
+    await order_parts_service.shutdown()
     print("Order Parts Service shutdown")
 
 @app.get("/health")
 async def health_check():
     return {"status": "OK"}
 
+@app.get("/stats")
+async def get_stats():
+    return {
+        "reorder_consumers": order_parts_service.consumers.stats() if order_parts_service.consumers else None,
+        "reorder_aggregation": order_parts_service.aggregator.stats() if order_parts_service.aggregator else None,
+    }
+
 # -------------- ORDER PARTS ENDPOINTS ---------------
 @app.post("/order")
 async def add_order(data: OrderPartsRequest):
     print(data)
-    map_ = order_parts_service.hz_client.get_map(order_parts_service.map_name).blocking()
+    parts = {}
     for item in data.parts:
-        existing = map_.get(item.id)
-        if existing:
-            existing["quantity"] += item.quantity
-            map_.put(item.id, existing)
-        else:
-            map_.put(item.id, item.dict())
+        parts[item.id] = parts.get(item.id, 0) + item.quantity
+    try:
+        await order_parts_service.order_parts(parts)
+    except LockTimeout as e:
+        print("Order lock timeout:", e)
+        raise HTTPException(status_code=409, detail="Order parts are busy, retry the order")
     return {"status": "inventory updated", "added": [item.id for item in data.parts]}
 
 @app.get("/order-parts")
-async def get_order_parts(request: Request):
-    return await order_parts_service.get_order_parts()
+async def get_order_parts(request: Request, limit: Optional[int] = None, cursor: Optional[str] = None, format: str = "json"):
+    return await order_parts_service.get_order_parts(limit, cursor, format)
 
 # -------------- STARTUP ---------------
 if __name__ == "__main__":
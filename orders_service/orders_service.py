@@ -3,39 +3,65 @@
 # python .\inventory_service\inventory_service.py --port 8006
 
 import argparse
-from typing import Dict
-from fastapi import FastAPI, HTTPException, Request
+import time
+from typing import Dict, Optional
+from fastapi import FastAPI, Header, HTTPException, Request
 import httpx
 import hazelcast
+from hazelcast import predicate
+from hazelcast.config import IndexType
 import os, sys
 from pydantic import BaseModel
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from shared.consul_utils import register_service, deregister_service, fetch_instances, get_consul_kv
-
-class OrderPart(BaseModel):
-    id: str
-    quantity: int
+from shared.consul_utils import register_service, deregister_service, get_consul_kv, get_consul_setting, ServiceWatcher
+from shared.listing import list_entries
+from shared.hz_async import AsyncHazelcast
+from shared.queue_workers import QueueWorkerPool
+from shared.schemas import OrderPart, Order, COMPACT_SERIALIZERS, to_plain, new_record_id
 
 class OrderPartsRequest(BaseModel):
     orders: Dict[str, int]
 
 class OrderService:
     def __init__(self, cluster_name, queue_name, map_name, service_name="orders-service"):
-        self.hz_client = hazelcast.HazelcastClient(cluster_name=cluster_name)
+        self.hz_client = hazelcast.HazelcastClient(cluster_name=cluster_name, compact_serializers=COMPACT_SERIALIZERS)
+        self.hz = AsyncHazelcast(self.hz_client)
         self.service_name = service_name
         self.map_name = map_name
-        self.msg_queue = self.hz_client.get_queue(queue_name)
+        self.msg_queue = self.hz.get_queue(queue_name)
         self.service_id = f"{service_name}-{os.getpid()}"
         self.inventory_service_instances = []
+        self.inventory_service_watcher = ServiceWatcher("inventory-service", on_change=self.set_inventory_service_instances)
+        self.intake_queue = None
+        self.intake_workers = None
+
+    async def get_orders(self, limit: Optional[int] = None, cursor: Optional[str] = None, format: str = "json"):
+        map_ = self.hz.get_map(self.map_name)
+        return await list_entries(map_, limit, cursor, format, decode=to_plain)
+
+    #HASH index on user_id, so one user's orders are found without scanning the map
+    async def ensure_indexes(self):
+        await self.hz.get_map(self.map_name).add_index(attributes=["user_id"], index_type=IndexType.HASH)
+
+    #The whole order is one record under a generated id
+    async def place_order(self, user_id: str, parts: dict, status: str = "placed"):
+        order = Order(id=new_record_id(), user_id=user_id, parts=parts, status=status, created_at=time.time())
+        await self.hz.get_map(self.map_name).put(order.id, order)
+        return order
+
+    async def get_order(self, order_id: str):
+        order = await self.hz.get_map(self.map_name).get(order_id)
+        if order is None:
+            raise HTTPException(status_code=404, detail="Order not found")
+        return to_plain(order)
 
-    async def get_orders(self):
-        map_ = self.hz_client.get_map(self.map_name).blocking()
-        all_keys = map_.key_set()
-        orders = {key: map_.get(key) for key in all_keys}
-        return orders
+    async def get_user_orders(self, user_id: str, limit: Optional[int] = None, cursor: Optional[str] = None, format: str = "json"):
+        map_ = self.hz.get_map(self.map_name)
+        return await list_entries(map_, limit, cursor, format, condition=predicate.equal("user_id", user_id), decode=to_plain)
     
     async def reserve_parts(self, items: list[OrderPart]):
         if not self.inventory_service_instances:
@@ -61,12 +87,81 @@ class OrderService:
         return False
 
     
-    async def fetch_service_addresses(self):
-        self.inventory_service_instances = await fetch_instances("inventory-service")
-        print(self.inventory_service_instances)
+    #Async intake: POST /log_order answers 202 and workers reserve queued orders in batches
+    def start_intake(self, queue_name, workers, batch_size, poll_timeout, max_attempts):
+        self.intake_queue = self.hz.get_queue(queue_name)
+        self.intake_workers = QueueWorkerPool(
+            self.intake_queue, self.process_orders, workers=workers, batch_size=batch_size,
+            poll_timeout=poll_timeout, max_attempts=max_attempts, on_give_up=self.fail_orders,
+        )
+        self.intake_workers.start()
+
+    #Stored as "accepted" first, so its status can be polled right away
+    async def accept_order(self, user_id: str, parts: dict):
+        order = await self.place_order(user_id, parts, status="accepted")
+        #Not left "accepted" when it never reached the queue, since no worker would pick it up
+        try:
+            queued = await self.intake_queue.offer(order.id)
+        except Exception as e:
+            print("Failed to queue order:", e)
+            queued = False
+        except BaseException:
+            await self.hz.get_map(self.map_name).delete(order.id)
+            raise
+        if not queued:
+            await self.hz.get_map(self.map_name).delete(order.id)
+            raise HTTPException(status_code=503, detail="Order could not be queued, retry later")
+        return order
+
+    #One batch reservation for all queued orders, then one put_all with their new status
+    async def process_orders(self, order_ids: list):
+        map_ = self.hz.get_map(self.map_name)
+        orders = await map_.get_all(list(dict.fromkeys(order_ids)))
+        pending = [order for order in orders.values() if getattr(order, "status", None) == "accepted"]
+        if not pending:
+            return
+        results = await self.reserve_batch([(f"{self.map_name}:{order.id}", order.parts) for order in pending])
+        await map_.put_all({
+            order.id: order.model_copy(update={"status": "rejected" if result["missing"] else "placed"})
+            for order, result in zip(pending, results)
+        })
+
+    #Orders the worker pool gave up on end as "failed" instead of staying "accepted"
+    async def fail_orders(self, order_ids: list):
+        map_ = self.hz.get_map(self.map_name)
+        orders = await map_.get_all(list(dict.fromkeys(order_ids)))
+        failed = {
+            order.id: order.model_copy(update={"status": "failed"})
+            for order in orders.values() if getattr(order, "status", None) == "accepted"
+        }
+        if failed:
+            await map_.put_all(failed)
+
+    #Raises when inventory cannot be reached, so the worker pool requeues the batch.
+    #Each reservation carries an idempotency key, so a requeued batch whose
+    #reservation already went through (e.g. put_all failed) is not reserved twice.
+    async def reserve_batch(self, requested: list):
+        if not self.inventory_service_instances:
+            raise RuntimeError("Inventory service not available")
+
+        url = f"{self.inventory_service_instances[0]}/reserve_inventory/batch"
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            resp = await client.post(url, json={"requests": [{"items": parts, "key": key} for key, parts in requested]})
+            resp.raise_for_status()
+            return resp.json()["results"]
+
+    def set_inventory_service_instances(self, instances):
+        self.inventory_service_instances = instances
 
-    def shutdown(self):
-        self.hz_client.shutdown()
+    #Consul blocking-query watcher keeps inventory-service instances fresh
+    async def watch_service_addresses(self):
+        await self.inventory_service_watcher.start()
+
+    async def shutdown(self):
+        if self.intake_workers:
+            await self.intake_workers.stop()
+        await self.inventory_service_watcher.stop()
+        self.hz.shutdown()
         print("Hazelcast client shutdown")
 
 
@@ -91,34 +186,64 @@ async def startup_event():
     order_service = OrderService(cluster_name=cluster_name_, queue_name = queue_name_, map_name=map_name_)
     port = int(os.environ["APP_PORT"])
     await register_service(order_service.service_name, order_service.service_id, "localhost", port)
-    await order_service.fetch_service_addresses()
+    await order_service.ensure_indexes()
+    if await get_consul_setting("orders-async-intake", False):
+        order_service.start_intake(
+            queue_name=await get_consul_setting("orders-intake-queue", "order-intake-queue"),
+            workers=await get_consul_setting("orders-intake-workers", 4),
+            batch_size=await get_consul_setting("orders-intake-batch-size", 32),
+            poll_timeout=await get_consul_setting("orders-intake-poll-timeout", 1.0),
+            max_attempts=await get_consul_setting("orders-intake-max-attempts", 10),
+        )
+    await order_service.watch_service_addresses()
 @app.on_event("shutdown")
 async def shutdown():
     await deregister_service(order_service.service_id)
-    order_service.shutdown()
+    await order_service.shutdown()
     print("Orders Service shutdown")
 
 @app.get("/health")
 async def health_check():
     return {"status": "OK"}
 
+@app.get("/stats")
+async def get_stats():
+    return {"intake_workers": order_service.intake_workers.stats() if order_service.intake_workers else None}
+
 # -------------- ORDER PARTS ENDPOINTS ---------------
+#X-User-Id is set by the gateway from the verified token
 @app.post("/log_order")
-async def add_order(data: OrderPartsRequest):
+async def add_order(data: OrderPartsRequest, x_user_id: str = Header("anonymous")):
+    if order_service.intake_workers is not None:
+        order = await order_service.accept_order(x_user_id, data.orders)
+        return JSONResponse(status_code=202, content={
+            "status": "accepted", "order_id": order.id, "status_url": f"/orders/{order.id}/status",
+        })
+
     parts = [OrderPart(id=k, quantity=v) for k, v in data.orders.items()]
     reserved = await order_service.reserve_parts(parts)
     if not reserved:
         raise HTTPException(status_code=400, detail="Could not reserve all parts")
 
-    map_ = order_service.hz_client.get_map(order_service.map_name).blocking()
-    for item in parts:
-        map_.put(item.id, item.dict())
-
-    return {"status": "order placed", "added": [item.id for item in parts]}
+    order = await order_service.place_order(x_user_id, data.orders)
+    return {"status": "order placed", "order_id": order.id, "added": [item.id for item in parts]}
 
 @app.get("/orders")
-async def get_orders(request: Request):
-    return await order_service.get_orders()
+async def get_orders(request: Request, limit: Optional[int] = None, cursor: Optional[str] = None, format: str = "json"):
+    return await order_service.get_orders(limit, cursor, format)
+
+@app.get("/orders/{order_id}")
+async def get_order(order_id: str):
+    return await order_service.get_order(order_id)
+
+@app.get("/orders/{order_id}/status")
+async def get_order_status(order_id: str):
+    order = await order_service.get_order(order_id)
+    return {"order_id": order_id, "status": order.get("status", "placed")}
+
+@app.get("/users/{user_id}/orders")
+async def get_user_orders(user_id: str, limit: Optional[int] = None, cursor: Optional[str] = None, format: str = "json"):
+    return await order_service.get_user_orders(user_id, limit, cursor, format)
 
 # -------------- STARTUP ---------------
 if __name__ == "__main__":
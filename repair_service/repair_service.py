@@ -3,41 +3,66 @@
 # python .\inventory_service\inventory_service.py --port 8006
 
 import argparse
-from typing import Dict
-from fastapi import FastAPI, HTTPException, Request
+import time
+from typing import Dict, Optional
+from fastapi import FastAPI, Header, HTTPException, Request
 import httpx
 import hazelcast
+from hazelcast import predicate
+from hazelcast.config import IndexType
 import os, sys
 from pydantic import BaseModel
 import uvicorn
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from shared.consul_utils import register_service, deregister_service, fetch_instances, get_consul_kv
-
-class OrderPart(BaseModel):
-    id: str
-    quantity: int
+from shared.consul_utils import register_service, deregister_service, get_consul_kv, get_consul_setting, ServiceWatcher
+from shared.listing import list_entries
+from shared.hz_async import AsyncHazelcast
+from shared.queue_workers import QueueWorkerPool
+from shared.schemas import OrderPart, Repair, COMPACT_SERIALIZERS, to_plain, new_record_id
 
 class OrderPartsRequest(BaseModel):
     orders: Dict[str, int]
 
 class RepairService:
     def __init__(self, cluster_name, queue_name, map_name, service_name="repair-service"):
-        self.hz_client = hazelcast.HazelcastClient(cluster_name=cluster_name)
+        self.hz_client = hazelcast.HazelcastClient(cluster_name=cluster_name, compact_serializers=COMPACT_SERIALIZERS)
+        self.hz = AsyncHazelcast(self.hz_client)
         self.service_name = service_name
         self.map_name = map_name
-        self.msg_queue = self.hz_client.get_queue(queue_name)
+        self.msg_queue = self.hz.get_queue(queue_name)
         self.service_id = f"{service_name}-{os.getpid()}"
         self.inventory_service_instances = []
+        self.inventory_service_watcher = ServiceWatcher("inventory-service", on_change=self.set_inventory_service_instances)
+        self.intake_queue = None
+        self.intake_workers = None
+
+    async def get_repairs(self, limit: Optional[int] = None, cursor: Optional[str] = None, format: str = "json"):
+        map_ = self.hz.get_map(self.map_name)
+        return await list_entries(map_, limit, cursor, format, decode=to_plain)
+
+    #HASH index on user_id, so one user's repairs are found without scanning the map
+    async def ensure_indexes(self):
+        await self.hz.get_map(self.map_name).add_index(attributes=["user_id"], index_type=IndexType.HASH)
 
-    async def get_repairs(self):
-        map_ = self.hz_client.get_map(self.map_name).blocking()
-        all_keys = map_.key_set()
-        orders = {key: map_.get(key) for key in all_keys}
-        return orders
+    #The whole repair is one record under a generated id
+    async def place_repair(self, user_id: str, parts: dict, status: str = "placed"):
+        repair = Repair(id=new_record_id(), user_id=user_id, parts=parts, status=status, created_at=time.time())
+        await self.hz.get_map(self.map_name).put(repair.id, repair)
+        return repair
+
+    async def get_repair(self, repair_id: str):
+        repair = await self.hz.get_map(self.map_name).get(repair_id)
+        if repair is None:
+            raise HTTPException(status_code=404, detail="Repair not found")
+        return to_plain(repair)
+
+    async def get_user_repairs(self, user_id: str, limit: Optional[int] = None, cursor: Optional[str] = None, format: str = "json"):
+        map_ = self.hz.get_map(self.map_name)
+        return await list_entries(map_, limit, cursor, format, condition=predicate.equal("user_id", user_id), decode=to_plain)
     
     async def reserve_parts(self, items: list[OrderPart]):
         if not self.inventory_service_instances:
@@ -63,12 +88,81 @@ class RepairService:
         return False
 
     
-    async def fetch_service_addresses(self):
-        self.inventory_service_instances = await fetch_instances("inventory-service")
-        print(self.inventory_service_instances)
+    #Async intake: POST /log_repair answers 202 and workers reserve queued repairs in batches
+    def start_intake(self, queue_name, workers, batch_size, poll_timeout, max_attempts):
+        self.intake_queue = self.hz.get_queue(queue_name)
+        self.intake_workers = QueueWorkerPool(
+            self.intake_queue, self.process_repairs, workers=workers, batch_size=batch_size,
+            poll_timeout=poll_timeout, max_attempts=max_attempts, on_give_up=self.fail_repairs,
+        )
+        self.intake_workers.start()
+
+    #Stored as "accepted" first, so its status can be polled right away
+    async def accept_repair(self, user_id: str, parts: dict):
+        repair = await self.place_repair(user_id, parts, status="accepted")
+        #Not left "accepted" when it never reached the queue, since no worker would pick it up
+        try:
+            queued = await self.intake_queue.offer(repair.id)
+        except Exception as e:
+            print("Failed to queue repair:", e)
+            queued = False
+        except BaseException:
+            await self.hz.get_map(self.map_name).delete(repair.id)
+            raise
+        if not queued:
+            await self.hz.get_map(self.map_name).delete(repair.id)
+            raise HTTPException(status_code=503, detail="Repair could not be queued, retry later")
+        return repair
+
+    #One batch reservation for all queued repairs, then one put_all with their new status
+    async def process_repairs(self, repair_ids: list):
+        map_ = self.hz.get_map(self.map_name)
+        repairs = await map_.get_all(list(dict.fromkeys(repair_ids)))
+        pending = [repair for repair in repairs.values() if getattr(repair, "status", None) == "accepted"]
+        if not pending:
+            return
+        results = await self.reserve_batch([(f"{self.map_name}:{repair.id}", repair.parts) for repair in pending])
+        await map_.put_all({
+            repair.id: repair.model_copy(update={"status": "rejected" if result["missing"] else "placed"})
+            for repair, result in zip(pending, results)
+        })
+
+    #Repairs the worker pool gave up on end as "failed" instead of staying "accepted"
+    async def fail_repairs(self, repair_ids: list):
+        map_ = self.hz.get_map(self.map_name)
+        repairs = await map_.get_all(list(dict.fromkeys(repair_ids)))
+        failed = {
+            repair.id: repair.model_copy(update={"status": "failed"})
+            for repair in repairs.values() if getattr(repair, "status", None) == "accepted"
+        }
+        if failed:
+            await map_.put_all(failed)
+
+    #Raises when inventory cannot be reached, so the worker pool requeues the batch.
+    #Each reservation carries an idempotency key, so a requeued batch whose
+    #reservation already went through (e.g. put_all failed) is not reserved twice.
+    async def reserve_batch(self, requested: list):
+        if not self.inventory_service_instances:
+            raise RuntimeError("Inventory service not available")
 
-    def shutdown(self):
-        self.hz_client.shutdown()
+        url = f"{self.inventory_service_instances[0]}/reserve_inventory/batch"
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            resp = await client.post(url, json={"requests": [{"items": parts, "key": key} for key, parts in requested]})
+            resp.raise_for_status()
+            return resp.json()["results"]
+
+    def set_inventory_service_instances(self, instances):
+        self.inventory_service_instances = instances
+
+    #Consul blocking-query watcher keeps inventory-service instances fresh
+    async def watch_service_addresses(self):
+        await self.inventory_service_watcher.start()
+
+    async def shutdown(self):
+        if self.intake_workers:
+            await self.intake_workers.stop()
+        await self.inventory_service_watcher.stop()
+        self.hz.shutdown()
         print("Hazelcast client shutdown")
 
 app = FastAPI()
@@ -98,34 +192,69 @@ async def startup_event():
     print("register")
     await register_service(repair_service.service_name, repair_service.service_id, "localhost", port)
     print("fetch addresses")
-    await repair_service.fetch_service_addresses()
+    await repair_service.ensure_indexes()
+    if await get_consul_setting("repairs-async-intake", False):
+        repair_service.start_intake(
+            queue_name=await get_consul_setting("repairs-intake-queue", "repair-intake-queue"),
+            workers=await get_consul_setting("repairs-intake-workers", 4),
+            batch_size=await get_consul_setting("repairs-intake-batch-size", 32),
+            poll_timeout=await get_consul_setting("repairs-intake-poll-timeout", 1.0),
+            max_attempts=await get_consul_setting("repairs-intake-max-attempts", 10),
+        )
+    await repair_service.watch_service_addresses()
 @app.on_event("shutdown")
 async def shutdown():
     await deregister_service(repair_service.service_id)
-    repair_service.shutdown()
+    await repair_service.shutdown()
     print("Repairs Service shutdown")
 
 @app.get("/health")
 async def health_check():
     return {"status": "OK"}
 
+@app.get("/stats")
+async def get_stats():
+    return {"intake_workers": repair_service.intake_workers.stats() if repair_service.intake_workers else None}
+
 # -------------- REPAIR ENDPOINTS ---------------
+#X-User-Id is set by the gateway from the verified token
 @app.post("/log_repair")
-async def add_repair(data: OrderPartsRequest):
+async def add_repair(data: OrderPartsRequest, x_user_id: str = Header("anonymous")):
+    if repair_service.intake_workers is not None:
+        repair = await repair_service.accept_repair(x_user_id, data.orders)
+        return JSONResponse(status_code=202, content={
+            "status": "accepted", "repair_id": repair.id, "status_url": f"/repairs/{repair.id}/status",
+        })
+
     parts = [OrderPart(id=k, quantity=v) for k, v in data.orders.items()]
     reserved = await repair_service.reserve_parts(parts)
     if not reserved:
         raise HTTPException(status_code=400, detail="Could not reserve all parts")
 
-    map_ = repair_service.hz_client.get_map(repair_service.map_name).blocking()
-    for item in parts:
-        map_.put(item.id, item.dict())
-
-    return {"status": "reapir logged", "added": [item.id for item in parts]}
+    repair = await repair_service.place_repair(x_user_id, data.orders)
+    return {"status": "reapir logged", "repair_id": repair.id, "added": [item.id for item in parts]}
 
 @app.get("/repairs")
-async def get_repairs(request: Request):
-    repairs = await repair_service.get_repairs()
+async def get_repairs(request: Request, limit: Optional[int] = None, cursor: Optional[str] = None, format: str = "json"):
+    repairs = await repair_service.get_repairs(limit, cursor, format)
+    if isinstance(repairs, StreamingResponse):
+        return repairs
+    return JSONResponse(content=repairs)
+
+@app.get("/repairs/{repair_id}")
+async def get_repair(repair_id: str):
+    return await repair_service.get_repair(repair_id)
+
+@app.get("/repairs/{repair_id}/status")
+async def get_repair_status(repair_id: str):
+    repair = await repair_service.get_repair(repair_id)
+    return {"repair_id": repair_id, "status": repair.get("status", "placed")}
+
+@app.get("/users/{user_id}/repairs")
+async def get_user_repairs(user_id: str, limit: Optional[int] = None, cursor: Optional[str] = None, format: str = "json"):
+    repairs = await repair_service.get_user_repairs(user_id, limit, cursor, format)
+    if isinstance(repairs, StreamingResponse):
+        return repairs
     return JSONResponse(content=repairs)
 
 # -------------- STARTUP ---------------
@@ -0,0 +1,131 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+
+
+class ConcurrencyLimiter:
+    # Caps in-flight requests to one upstream. Callers beyond the cap wait in
+    # a bounded FIFO queue; when the queue is full, or the wait exceeds
+    # queue_timeout, acquire() returns False so the caller can fail fast.
+    def __init__(self, max_concurrent=64, max_queue=128, queue_timeout=1.0):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiters = deque()
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    async def acquire(self):
+        if self.active < self.max_concurrent and not self.waiters:
+            self.active += 1
+            self.admitted += 1
+            return True
+        if len(self.waiters) >= self.max_queue:
+            self.rejected += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._drop_waiter(waiter)
+            self.timed_out += 1
+            return False
+        except asyncio.CancelledError:
+            # The slot may have been handed over just before the cancellation
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                self._drop_waiter(waiter)
+            raise
+        self.admitted += 1
+        return True
+
+    def _drop_waiter(self, waiter):
+        try:
+            self.waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    #Hands the slot straight to the oldest waiter, if any
+    def release(self):
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(True)
+                return
+        self.active = max(0, self.active - 1)
+
+    def update(self, max_concurrent, max_queue, queue_timeout):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        while self.waiters and self.active < self.max_concurrent:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                self.active += 1
+                waiter.set_result(True)
+
+    def stats(self):
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "queued": len(self.waiters),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+
+class RateLimiter:
+    # Token bucket per key (user id). The least recently seen buckets are
+    # dropped once max_keys is reached; a returning user starts with a full one.
+    def __init__(self, rate=20.0, burst=60, max_keys=10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.buckets = OrderedDict()
+        self.allowed = 0
+        self.throttled = 0
+
+    #Returns 0 when allowed, otherwise seconds until enough tokens refill;
+    #inf when cost is above burst, since the bucket can never hold that many
+    def acquire(self, key, cost=1):
+        if cost > self.burst:
+            self.throttled += 1
+            return math.inf
+        now = time.monotonic()
+        tokens, updated_at = self.buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+
+        if tokens >= cost:
+            tokens -= cost
+            retry_after = 0.0
+            self.allowed += 1
+        else:
+            retry_after = (cost - tokens) / self.rate if self.rate > 0 else 1.0
+            self.throttled += 1
+
+        self.buckets[key] = (tokens, now)
+        self.buckets.move_to_end(key)
+        while len(self.buckets) > self.max_keys:
+            self.buckets.popitem(last=False)
+        return retry_after
+
+    def update(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+
+    def stats(self):
+        return {
+            "rate": self.rate,
+            "burst": self.burst,
+            "tracked_keys": len(self.buckets),
+            "allowed": self.allowed,
+            "throttled": self.throttled,
+        }
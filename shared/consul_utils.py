@@ -1,3 +1,5 @@
+import asyncio
+import base64
 import httpx
 
 async def register_service(service_name, service_id, service_ip, service_port):
@@ -51,4 +53,116 @@ async def get_consul_kv(key):
                 return base64.b64decode(value).decode()
         except Exception as e:
             print(f"Failed to fetch {key} from Consul:", e)
-    return ""
\ No newline at end of file
+    return ""
+
+async def get_consul_kv_entry(key):
+    # Value together with its ModifyIndex, for check-and-set updates
+    url = f"http://localhost:8500/v1/kv/{key}"
+    async with httpx.AsyncClient() as client:
+        try:
+            resp = await client.get(url)
+            if resp.status_code == 200:
+                entry = resp.json()[0]
+                value = base64.b64decode(entry["Value"] or "").decode()
+                return value, entry["ModifyIndex"]
+        except Exception as e:
+            print(f"Failed to fetch {key} from Consul:", e)
+    return "", 0
+
+async def put_consul_kv(key, value, cas=None):
+    # With cas=0 the write only succeeds if the key does not exist yet
+    url = f"http://localhost:8500/v1/kv/{key}"
+    params = {"cas": cas} if cas is not None else None
+    async with httpx.AsyncClient() as client:
+        resp = await client.put(url, content=value.encode(), params=params)
+        resp.raise_for_status()
+        return resp.json() is True
+
+async def get_consul_setting(key, default):
+    # Optional tuning value from Consul KV, cast to the type of the default.
+    raw = await get_consul_kv(key)
+    if raw == "":
+        return default
+    try:
+        if isinstance(default, bool):
+            return raw.strip().lower() in ("1", "true", "yes", "on")
+        return type(default)(raw)
+    except ValueError:
+        print(f"Invalid value for {key}: {raw!r}, using {default}")
+        return default
+
+
+class ServiceWatcher:
+    # Keeps the passing instances of one service up to date with Consul
+    # blocking queries. `instances` is only ever replaced, never mutated, so
+    # readers on the request path always see a complete list.
+    def __init__(self, service_name: str, on_change=None, wait: float = 30.0, retry_delay: float = 2.0):
+        self.service_name = service_name
+        self.on_change = on_change
+        self.wait = wait
+        self.retry_delay = retry_delay
+        self.instances = []
+        self.index = 0
+        self._ready = asyncio.Event()
+        self._task = None
+        self._client = None
+
+    @staticmethod
+    def _parse(entries):
+        instances = []
+        for entry in entries:
+            service = entry["Service"]
+            address = service.get("Address") or entry["Node"]["Address"]
+            instances.append(f"http://{address}:{service['Port']}")
+        return sorted(instances)
+
+    async def _poll(self):
+        url = f"http://localhost:8500/v1/health/service/{self.service_name}"
+        params = {"passing": "true", "index": self.index, "wait": f"{int(self.wait)}s"}
+        resp = await self._client.get(url, params=params)
+        resp.raise_for_status()
+
+        new_index = int(resp.headers.get("X-Consul-Index", 0))
+        # Index going backwards means Consul state was reset, start over
+        self.index = new_index if new_index >= self.index else 0
+
+        instances = self._parse(resp.json())
+        if instances != self.instances or not self._ready.is_set():
+            self.instances = instances
+            print(f"{self.service_name} instances: {instances}")
+            if self.on_change:
+                self.on_change(instances)
+        self._ready.set()
+
+    async def _run(self):
+        while True:
+            try:
+                await self._poll()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Failed to watch {self.service_name} in Consul:", e)
+                self.index = 0
+                await asyncio.sleep(self.retry_delay)
+
+    async def start(self, ready_timeout: float = 5.0):
+        if self._task is None:
+            # Consul may hold the query up to wait + wait/16 of jitter
+            self._client = httpx.AsyncClient(timeout=self.wait * 1.1 + 5.0)
+            self._task = asyncio.create_task(self._run())
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout=ready_timeout)
+        except asyncio.TimeoutError:
+            print(f"No instances of {self.service_name} discovered yet")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
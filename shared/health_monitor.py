@@ -0,0 +1,164 @@
+import asyncio
+import time
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold=3, reset_timeout=10.0, trial_timeout=None):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.trial_timeout = reset_timeout if trial_timeout is None else trial_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.trial_started_at = 0.0
+
+    #Open breaker becomes half-open once the reset timeout has passed.
+    #A trial whose outcome was never reported (e.g. the request was cancelled)
+    #expires after trial_timeout, so the instance gets another trial.
+    def _refresh(self):
+        now = time.monotonic()
+        if self.state == self.OPEN and now - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self.trial_in_flight = False
+        elif self.state == self.HALF_OPEN and self.trial_in_flight and now - self.trial_started_at >= self.trial_timeout:
+            self.trial_in_flight = False
+
+    #Can a request go to this instance right now (no side effects)
+    def is_available(self):
+        self._refresh()
+        if self.state == self.CLOSED:
+            return True
+        return self.state == self.HALF_OPEN and not self.trial_in_flight
+
+    #Claim the instance for a request; in half-open only one trial is let through
+    def allow_request(self):
+        if not self.is_available():
+            return False
+        if self.state == self.HALF_OPEN:
+            self.trial_in_flight = True
+            self.trial_started_at = time.monotonic()
+        return True
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.trial_in_flight = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    #A passing probe on an ejected instance only earns it a half-open trial
+    def record_probe_success(self):
+        self._refresh()
+        if self.state == self.OPEN:
+            self.state = self.HALF_OPEN
+            self.trial_in_flight = False
+        elif self.state == self.CLOSED:
+            self.failures = 0
+
+
+class HealthMonitor:
+    # Probes every known instance in the background and keeps a breaker per
+    # instance, so the request path picks an instance without any network call.
+    def __init__(self, http_pool, interval=5.0, probe_timeout=1.0,
+                 failure_threshold=3, reset_timeout=10.0):
+        self.http_pool = http_pool
+        self.interval = interval
+        self.probe_timeout = probe_timeout
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.instances = {}
+        self.breakers = {}
+        self._task = None
+
+    def set_instances(self, service_name, instances):
+        for instance in instances:
+            if instance not in self.breakers:
+                self.breakers[instance] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+        self.instances[service_name] = list(instances)
+        known = {i for group in self.instances.values() for i in group}
+        for instance in list(self.breakers):
+            if instance not in known:
+                del self.breakers[instance]
+
+    def get_instances(self, service_name):
+        return self.instances.get(service_name, [])
+
+    def live_instances(self, service_name):
+        return [i for i in self.get_instances(service_name) if self.breakers[i].is_available()]
+
+    def pick(self, service_name, balancer=None):
+        candidates = self.live_instances(service_name)
+        if not candidates:
+            return None
+        instance = balancer.choose(candidates) if balancer else candidates[0]
+        self.breakers[instance].allow_request()
+        return instance
+
+    def record_success(self, instance):
+        breaker = self.breakers.get(instance)
+        if breaker:
+            breaker.record_success()
+
+    def record_failure(self, instance):
+        breaker = self.breakers.get(instance)
+        if breaker:
+            breaker.record_failure()
+
+    async def probe(self, instance):
+        try:
+            resp = await self.http_pool.request(instance, "GET", "/health", timeout=self.probe_timeout)
+            healthy = resp.status_code == 200
+        except Exception:
+            healthy = False
+
+        breaker = self.breakers.get(instance)
+        if breaker is None:
+            return
+        if healthy:
+            breaker.record_probe_success()
+        else:
+            breaker.record_failure()
+
+    async def probe_all(self):
+        await asyncio.gather(*(self.probe(instance) for instance in list(self.breakers)))
+
+    async def _run(self):
+        while True:
+            await self.probe_all()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self):
+        return {
+            service_name: {
+                instance: {
+                    "state": self.breakers[instance].state,
+                    "failures": self.breakers[instance].failures,
+                    "live": self.breakers[instance].is_available(),
+                }
+                for instance in instances
+            }
+            for service_name, instances in self.instances.items()
+        }
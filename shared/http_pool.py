@@ -0,0 +1,64 @@
+import asyncio
+
+import httpx
+
+try:
+    import h2  # noqa: F401 - only needed when http2 is enabled
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class HTTPClientPool:
+    # Keeps one long-lived httpx.AsyncClient per upstream base url, so proxied
+    # calls reuse keep-alive connections instead of paying TCP setup each time.
+    def __init__(self, max_connections=100, max_keepalive_connections=20,
+                 keepalive_expiry=30.0, http2=False, timeout=5.0):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        if http2 and not HTTP2_AVAILABLE:
+            print("HTTP/2 requested but 'h2' is not installed, falling back to HTTP/1.1")
+            http2 = False
+        self.http2 = http2
+        self.timeout = timeout
+        self.clients = {}
+        self.retiring = {}  # client -> task that closes it
+
+    def get_client(self, base_url: str) -> httpx.AsyncClient:
+        client = self.clients.get(base_url)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                base_url=base_url,
+                limits=self.limits,
+                timeout=self.timeout,
+                http2=self.http2,
+            )
+            self.clients[base_url] = client
+        return client
+
+    async def request(self, base_url: str, method: str, path: str, **kwargs) -> httpx.Response:
+        return await self.get_client(base_url).request(method, path, **kwargs)
+
+    #Drops clients for base urls that are gone (e.g. deregistered instances).
+    #They are closed after close_delay, so requests still running on them finish.
+    def retain(self, base_urls, close_delay=30.0):
+        for base_url in [url for url in self.clients if url not in base_urls]:
+            client = self.clients.pop(base_url)
+            self.retiring[client] = asyncio.create_task(self._close_later(client, close_delay))
+
+    async def _close_later(self, client, delay):
+        await asyncio.sleep(delay)
+        self.retiring.pop(client, None)
+        await client.aclose()
+
+    async def close(self):
+        clients = list(self.clients.values()) + list(self.retiring)
+        self.clients = {}
+        for task in self.retiring.values():
+            task.cancel()
+        self.retiring = {}
+        for client in clients:
+            await client.aclose()
@@ -0,0 +1,68 @@
+import asyncio
+
+from hazelcast.future import Future
+
+
+def _copy_result(hz_future, future):
+    if future.cancelled():
+        return
+    try:
+        future.set_result(hz_future.result())
+    except Exception as e:
+        future.set_exception(e)
+
+
+#Wraps a Hazelcast client future in an asyncio future. The client completes
+#futures on its reactor thread, so the result is handed back to the loop.
+def to_asyncio(hz_future, loop=None):
+    loop = loop or asyncio.get_running_loop()
+    future = loop.create_future()
+    hz_future.add_done_callback(lambda done: loop.call_soon_threadsafe(_copy_result, done, future))
+    return future
+
+
+class AsyncProxy:
+    # Async view of a non-blocking Hazelcast proxy (map, queue, ...): every
+    # method that returns a client future becomes awaitable, so a slow call
+    # only suspends its own request instead of the whole event loop.
+    def __init__(self, proxy):
+        self.proxy = proxy
+        self.name = proxy.name
+
+    def __getattr__(self, name):
+        method = getattr(self.proxy, name)
+        if not callable(method):
+            return method
+
+        async def call(*args, **kwargs):
+            result = method(*args, **kwargs)
+            if isinstance(result, Future):
+                return await to_asyncio(result)
+            return result
+
+        call.__name__ = name
+        setattr(self, name, call)
+        return call
+
+
+class AsyncHazelcast:
+    # Shared data-access layer for the services: one client, one proxy per
+    # map or queue name, created on first use and reused by every request.
+    def __init__(self, client):
+        self.client = client
+        self.proxies = {}
+
+    def _proxy(self, kind, name, factory):
+        proxy = self.proxies.get((kind, name))
+        if proxy is None:
+            proxy = self.proxies[(kind, name)] = AsyncProxy(factory(name))
+        return proxy
+
+    def get_map(self, name):
+        return self._proxy("map", name, self.client.get_map)
+
+    def get_queue(self, name):
+        return self._proxy("queue", name, self.client.get_queue)
+
+    def shutdown(self):
+        self.client.shutdown()
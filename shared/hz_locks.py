@@ -0,0 +1,67 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+
+class LockTimeout(Exception):
+    pass
+
+
+class MapKeyLocks:
+    # Locks a set of map keys across processes with Hazelcast key locks,
+    # taken through an AsyncProxy map (shared.hz_async).
+    # Hazelcast lock ownership is per client thread, so every coroutine on the
+    # event loop would share it; per-key asyncio locks keep coroutines in this
+    # process apart as well. Keys are always taken in sorted order to avoid
+    # deadlocks between overlapping reservations.
+    def __init__(self, lease_time=10.0, timeout=2.0):
+        self.lease_time = lease_time
+        self.timeout = timeout
+        self.local_locks = {}
+        self.waiting = {}
+
+    def _local_lock(self, key):
+        lock = self.local_locks.get(key)
+        if lock is None:
+            lock = self.local_locks[key] = asyncio.Lock()
+        self.waiting[key] = self.waiting.get(key, 0) + 1
+        return lock
+
+    def _forget(self, key):
+        self.waiting[key] -= 1
+        if self.waiting[key] == 0:
+            del self.waiting[key]
+            del self.local_locks[key]
+
+    @asynccontextmanager
+    async def locked(self, map_, keys):
+        keys = sorted(set(keys))
+        registered = []
+        local_held = []
+        remote_held = []
+        try:
+            for key in keys:
+                lock = self._local_lock(key)
+                registered.append(key)
+                try:
+                    await asyncio.wait_for(lock.acquire(), self.timeout)
+                except asyncio.TimeoutError:
+                    raise LockTimeout(f"Timed out waiting for {key}")
+                local_held.append(lock)
+            for key in keys:
+                if not await map_.try_lock(key, lease_time=self.lease_time, timeout=self.timeout):
+                    raise LockTimeout(f"Could not lock {key}")
+                remote_held.append(key)
+            yield
+        finally:
+            try:
+                # A failed unlock is left to the lease; the other keys are still unlocked
+                for key in reversed(remote_held):
+                    try:
+                        await map_.unlock(key)
+                    except Exception as e:
+                        print(f"Failed to unlock {key}:", e)
+            finally:
+                for lock in reversed(local_held):
+                    lock.release()
+                for key in registered:
+                    self._forget(key)
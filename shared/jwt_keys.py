@@ -0,0 +1,135 @@
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import JWTError, jwk, jwt
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from shared.consul_utils import get_consul_kv_entry, get_consul_setting, put_consul_kv
+
+ALGORITHM = "RS256"
+SIGNING_KEYS_KV = "auth-signing-keys"
+
+# Key set stored in Consul KV under SIGNING_KEYS_KV:
+# {"current": kid, "keys": {kid: private_pem, ...}, "next": kid, "next_active_at": unix time}
+# with the newest kid last. A rotated key is published as "next" (so it is in
+# every JWKS) and only signs tokens from next_active_at on, once every auth
+# instance has had time to load it.
+
+
+def generate_signing_key():
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+    return uuid.uuid4().hex[:16], pem
+
+
+def public_jwk(kid, private_pem):
+    key = jwk.construct(private_pem, ALGORITHM).public_key().to_dict()
+    key.update({"kid": kid, "use": "sig"})
+    return key
+
+
+def jwks_from_key_set(key_set):
+    return {"keys": [public_jwk(kid, pem) for kid, pem in key_set["keys"].items()]}
+
+
+#Shared key set from Consul; the first auth instance to start creates it
+async def load_signing_keys():
+    raw, _ = await get_consul_kv_entry(SIGNING_KEYS_KV)
+    if not raw:
+        kid, pem = generate_signing_key()
+        created = await put_consul_kv(SIGNING_KEYS_KV, json.dumps({"current": kid, "keys": {kid: pem}}), cas=0)
+        print("Created JWT signing key in Consul" if created else "JWT signing key created by another instance")
+        raw, _ = await get_consul_kv_entry(SIGNING_KEYS_KV)
+    return json.loads(raw)
+
+
+#Kid that signs new tokens right now
+def active_kid(key_set, now=None):
+    next_kid = key_set.get("next")
+    if next_kid and (time.time() if now is None else now) >= key_set.get("next_active_at", 0):
+        return next_kid
+    return key_set["current"]
+
+
+#Publishes a new key that takes over signing after activation_delay, and keeps
+#the previous ones so issued tokens stay valid
+async def rotate_signing_keys(keep=2, activation_delay=120.0):
+    while True:
+        raw, index = await get_consul_kv_entry(SIGNING_KEYS_KV)
+        key_set = json.loads(raw) if raw else {"current": None, "keys": {}}
+        kid, pem = generate_signing_key()
+        if key_set["current"] is None:
+            key_set["current"] = kid
+        else:
+            key_set["current"] = active_kid(key_set)
+            key_set["next"] = kid
+            key_set["next_active_at"] = time.time() + activation_delay
+        key_set["keys"][kid] = pem
+        for old_kid in list(key_set["keys"])[:-keep]:
+            if old_kid != key_set["current"]:
+                del key_set["keys"][old_kid]
+        if await put_consul_kv(SIGNING_KEYS_KV, json.dumps(key_set), cas=index):
+            print(f"Published JWT signing key {kid}, signing with it from {key_set.get('next_active_at', time.time()):.0f}")
+            return key_set
+
+
+#Waits two key refresh intervals before the new key signs anything
+async def rotate_from_settings():
+    refresh_interval = await get_consul_setting("auth-key-refresh-interval", 60.0)
+    return await rotate_signing_keys(activation_delay=2 * refresh_interval)
+
+
+class JWKSCache:
+    # Public keys fetched from the auth service's JWKS endpoint. Tokens are
+    # verified in-process; an unknown kid (after a rotation) triggers a refetch.
+    def __init__(self, fetch_jwks, ttl=300.0, min_refresh_interval=10.0):
+        self.fetch_jwks = fetch_jwks
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval
+        self.keys = {}
+        self.fetched_at = 0.0
+        self.attempted_at = float("-inf")
+        self._lock = asyncio.Lock()
+
+    async def refresh(self):
+        async with self._lock:
+            if time.monotonic() - self.attempted_at < self.min_refresh_interval:
+                return
+            self.attempted_at = time.monotonic()
+            jwks = await self.fetch_jwks()
+            if jwks is None:
+                return
+            self.keys = {key["kid"]: key for key in jwks.get("keys", [])}
+            self.fetched_at = time.monotonic()
+
+    async def get_key(self, kid):
+        if kid not in self.keys or time.monotonic() - self.fetched_at > self.ttl:
+            await self.refresh()
+        return self.keys.get(kid)
+
+    async def verify(self, token):
+        try:
+            kid = jwt.get_unverified_header(token).get("kid")
+        except JWTError:
+            return None
+        key = await self.get_key(kid)
+        if key is None:
+            return None
+        try:
+            return jwt.decode(token, key, algorithms=[ALGORITHM])
+        except JWTError:
+            return None
+
+
+if __name__ == "__main__":
+    asyncio.run(rotate_from_settings())
@@ -0,0 +1,68 @@
+import json
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from hazelcast import predicate
+
+MAX_PAGE_SIZE = 1000
+
+
+#One page of entries with keys after `cursor`, ordered by key (keyset pagination).
+#The paging predicate sorts and cuts the page on the cluster, so this is a
+#single round trip no matter how large the map is.
+async def fetch_page(map_, limit, cursor=None, condition=None):
+    if condition is None:
+        condition = predicate.true()
+    if cursor is not None:
+        condition = predicate.and_(condition, predicate.greater("__key", cursor))
+    entries = await map_.entry_set(predicate.paging(condition, limit))
+    return sorted(entries, key=lambda entry: entry[0])
+
+
+def decode_entries(entries, decode=None):
+    if decode is None:
+        return dict(entries)
+    return {key: decode(value) for key, value in entries}
+
+
+async def iter_ndjson(map_, page_size, cursor=None, limit=None, condition=None, decode=None):
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = page_size if remaining is None else min(page_size, remaining)
+        page = await fetch_page(map_, size, cursor, condition)
+        for key, value in page:
+            if decode is not None:
+                value = decode(value)
+            yield json.dumps({"id": key, "value": value}) + "\n"
+        if len(page) < size:
+            return
+        cursor = page[-1][0]
+        if remaining is not None:
+            remaining -= len(page)
+
+
+#Lists an AsyncProxy map for GET /inventory, /orders, /repairs and /order-parts.
+#Without limit/cursor the whole map comes back as {key: value}, fetched with a
+#single entry_set call. With them, one page plus next_cursor. format=ndjson
+#streams one {"id", "value"} line per entry, reading the map page by page.
+#`decode` turns stored values (e.g. HazelcastJsonValue) back into plain JSON.
+async def list_entries(map_, limit=None, cursor=None, format="json", condition=None, decode=None):
+    if limit is not None and limit <= 0:
+        raise HTTPException(status_code=400, detail="limit must be positive")
+
+    if format == "ndjson":
+        return StreamingResponse(
+            iter_ndjson(map_, MAX_PAGE_SIZE, cursor, limit, condition, decode),
+            media_type="application/x-ndjson",
+        )
+    if format != "json":
+        raise HTTPException(status_code=400, detail="format must be json or ndjson")
+
+    if limit is None and cursor is None:
+        entries = await (map_.entry_set(condition) if condition is not None else map_.entry_set())
+        return decode_entries(sorted(entries, key=lambda entry: entry[0]), decode)
+
+    limit = min(limit or MAX_PAGE_SIZE, MAX_PAGE_SIZE)
+    page = await fetch_page(map_, limit, cursor, condition)
+    next_cursor = page[-1][0] if len(page) == limit else None
+    return {"items": decode_entries(page, decode), "next_cursor": next_cursor}
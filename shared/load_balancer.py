@@ -0,0 +1,109 @@
+import random
+import time
+
+
+class InstanceLoad:
+    def __init__(self):
+        self.outstanding = 0
+        self.ewma_latency = 0.0
+        self.requests = 0
+
+
+class LoadBalancer:
+    # Base strategy: tracks in-flight requests and an EWMA of latency per
+    # instance; subclasses only decide which live candidate to use.
+    name = "first"
+
+    def __init__(self, ewma_alpha=0.3):
+        self.ewma_alpha = ewma_alpha
+        self.load = {}
+
+    def _load(self, instance):
+        load = self.load.get(instance)
+        if load is None:
+            load = self.load[instance] = InstanceLoad()
+        return load
+
+    def choose(self, candidates):
+        return candidates[0]
+
+    def on_start(self, instance):
+        self._load(instance).outstanding += 1
+        return time.perf_counter()
+
+    def on_finish(self, instance, started_at):
+        load = self._load(instance)
+        load.outstanding = max(0, load.outstanding - 1)
+        latency = time.perf_counter() - started_at
+        if load.requests == 0:
+            load.ewma_latency = latency
+        else:
+            load.ewma_latency = self.ewma_alpha * latency + (1 - self.ewma_alpha) * load.ewma_latency
+        load.requests += 1
+
+    def forget(self, known_instances):
+        for instance in list(self.load):
+            if instance not in known_instances:
+                del self.load[instance]
+
+    def stats(self):
+        return {
+            "strategy": self.name,
+            "instances": {
+                instance: {
+                    "outstanding": load.outstanding,
+                    "ewma_latency_ms": round(load.ewma_latency * 1000, 3),
+                    "requests": load.requests,
+                }
+                for instance, load in self.load.items()
+            },
+        }
+
+
+class RoundRobinBalancer(LoadBalancer):
+    name = "round-robin"
+
+    def __init__(self, ewma_alpha=0.3):
+        super().__init__(ewma_alpha)
+        self.counter = 0
+
+    def choose(self, candidates):
+        instance = candidates[self.counter % len(candidates)]
+        self.counter += 1
+        return instance
+
+
+class LeastOutstandingBalancer(LoadBalancer):
+    name = "least-outstanding"
+
+    def choose(self, candidates):
+        return min(candidates, key=lambda i: self._load(i).outstanding)
+
+
+class PowerOfTwoChoicesBalancer(LoadBalancer):
+    name = "p2c-ewma"
+
+    def _cost(self, instance):
+        load = self._load(instance)
+        return load.ewma_latency * (load.outstanding + 1)
+
+    def choose(self, candidates):
+        if len(candidates) == 1:
+            return candidates[0]
+        first, second = random.sample(candidates, 2)
+        return first if self._cost(first) <= self._cost(second) else second
+
+
+STRATEGIES = {
+    RoundRobinBalancer.name: RoundRobinBalancer,
+    LeastOutstandingBalancer.name: LeastOutstandingBalancer,
+    PowerOfTwoChoicesBalancer.name: PowerOfTwoChoicesBalancer,
+}
+
+
+def make_balancer(strategy, ewma_alpha=0.3):
+    balancer_class = STRATEGIES.get(strategy)
+    if balancer_class is None:
+        print(f"Unknown load balancing strategy {strategy!r}, using round-robin")
+        balancer_class = RoundRobinBalancer
+    return balancer_class(ewma_alpha)
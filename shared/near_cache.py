@@ -0,0 +1,159 @@
+import threading
+import time
+from collections import OrderedDict
+
+from hazelcast.lifecycle import LifecycleState
+
+EVICTION_POLICIES = ("lru", "lfu")
+
+
+class NearCache:
+    # In-process cache of hot map values for single-key reads. It is bounded
+    # by max_size (evicting by LRU or LFU) and by TTL. Entries are dropped on
+    # remote updates through a Hazelcast entry listener (see listen). Only
+    # plain reads go through it: reservations and other read-modify-write
+    # paths still read the cluster under their locks.
+    def __init__(self, max_size=10000, ttl=60.0, eviction="lru"):
+        if eviction not in EVICTION_POLICIES:
+            raise ValueError(f"eviction must be one of {', '.join(EVICTION_POLICIES)}")
+        self.max_size = max_size
+        self.ttl = ttl
+        self.eviction = eviction
+        self.entries = OrderedDict()  # key -> (value, expires_at)
+        self.frequencies = {}  # lfu: key -> reads
+        self.buckets = {}  # lfu: reads -> keys in insertion order
+        self.clears = 0
+        self.invalidated_at = OrderedDict()  # key -> last invalidation, kept for ttl
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._touch(key)
+            self.hits += 1
+            return entry[0]
+
+    #Read before going to the cluster and passed to put, so a value fetched
+    #while that key (or the whole cache) was invalidated is not cached.
+    #Invalidations of other keys do not affect it.
+    def generation(self):
+        with self.lock:
+            return self.clears, time.monotonic()
+
+    def put(self, key, value, generation):
+        with self.lock:
+            clears, started_at = generation
+            # Loads older than ttl are dropped too, so invalidated_at only needs to cover ttl
+            if clears != self.clears or time.monotonic() - started_at > self.ttl:
+                return
+            invalidated_at = self.invalidated_at.get(key)
+            if invalidated_at is not None and invalidated_at >= started_at:
+                return
+            if key in self.entries:
+                self._remove(key)
+            while self.entries and len(self.entries) >= self.max_size:
+                self._evict()
+            self.entries[key] = (value, time.monotonic() + self.ttl)
+            if self.eviction == "lfu":
+                self.frequencies[key] = 1
+                self.buckets.setdefault(1, OrderedDict())[key] = None
+
+    #Drops the given keys, or everything when keys is None
+    def invalidate(self, keys=None):
+        with self.lock:
+            if keys is None:
+                self.clears += 1
+                self.invalidated_at.clear()
+                self.invalidations += len(self.entries)
+                self.entries.clear()
+                self.frequencies.clear()
+                self.buckets.clear()
+                return
+            now = time.monotonic()
+            for key in keys:
+                self.invalidated_at[key] = now
+                self.invalidated_at.move_to_end(key)
+                if key in self.entries:
+                    self._remove(key)
+                    self.invalidations += 1
+            while self.invalidated_at and next(iter(self.invalidated_at.values())) < now - self.ttl:
+                self.invalidated_at.popitem(last=False)
+
+    def _touch(self, key):
+        if self.eviction == "lru":
+            self.entries.move_to_end(key)
+            return
+        frequency = self.frequencies[key]
+        self._unbucket(key, frequency)
+        self.frequencies[key] = frequency + 1
+        self.buckets.setdefault(frequency + 1, OrderedDict())[key] = None
+
+    def _unbucket(self, key, frequency):
+        bucket = self.buckets[frequency]
+        del bucket[key]
+        if not bucket:
+            del self.buckets[frequency]
+
+    def _remove(self, key):
+        del self.entries[key]
+        if self.eviction == "lfu":
+            self._unbucket(key, self.frequencies.pop(key))
+
+    def _evict(self):
+        if self.eviction == "lru":
+            key = next(iter(self.entries))
+        else:
+            key = next(iter(self.buckets[min(self.buckets)]))
+        self._remove(key)
+        self.evictions += 1
+
+    #Invalidates on entry events from any client, and drops everything after
+    #a reconnect since events may have been missed meanwhile
+    async def listen(self, map_, lifecycle_service):
+        def on_entry_event(event):
+            self.invalidate([event.key])
+
+        def on_map_event(event):
+            self.invalidate()
+
+        await map_.add_entry_listener(
+            include_value=False,
+            added_func=on_entry_event,
+            updated_func=on_entry_event,
+            removed_func=on_entry_event,
+            evicted_func=on_entry_event,
+            expired_func=on_entry_event,
+            merged_func=on_entry_event,
+            clear_all_func=on_map_event,
+            evict_all_func=on_map_event,
+        )
+
+        def on_lifecycle_change(state):
+            if state == LifecycleState.CONNECTED:
+                self.invalidate()
+
+        lifecycle_service.add_listener(on_lifecycle_change)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "eviction": self.eviction,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
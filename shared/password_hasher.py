@@ -0,0 +1,80 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import bcrypt
+
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+def _hash_password(password: bytes, rounds: int):
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+
+
+def _check_password(password: bytes, hashed_password: bytes):
+    return bcrypt.checkpw(password, hashed_password)
+
+
+def _warm_up():
+    return os.getpid()
+
+
+class PasswordHasher:
+    # Runs bcrypt in a pool of worker processes so hashing never blocks the
+    # event loop. Jobs beyond the workers wait in the pool's queue; once
+    # `max_queue` are waiting, new ones are refused with PasswordHasherBusy
+    # instead of piling up. `rounds` is the cost factor for new hashes, and
+    # existing hashes keep the cost they were created with.
+    def __init__(self, workers=None, rounds=12, max_queue=256):
+        self.workers = workers or os.cpu_count() or 1
+        self.rounds = rounds
+        self.max_queue = max_queue
+        # spawn: forking a process that already runs the Hazelcast client's threads is unsafe
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_time = 0.0
+
+    #Starts every worker up front so the first logins do not pay for process startup
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.pool, _warm_up) for _ in range(self.workers)))
+
+    async def _run(self, fn, *args):
+        if self.in_flight >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise PasswordHasherBusy("Too many password checks in progress")
+        self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.pool, fn, *args)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self.total_time += time.perf_counter() - start
+
+    async def hash(self, password: str):
+        hashed = await self._run(_hash_password, password.encode("utf-8"), self.rounds)
+        return hashed.decode("utf-8")
+
+    async def verify(self, password: str, hashed_password: str):
+        return await self._run(_check_password, password.encode("utf-8"), hashed_password.encode("utf-8"))
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "rounds": self.rounds,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_ms": round(self.total_time / self.completed * 1000, 2) if self.completed else 0.0,
+        }
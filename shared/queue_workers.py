@@ -0,0 +1,156 @@
+import asyncio
+import json
+from collections import OrderedDict
+
+REQUEUE_ATTEMPTS = 3
+MAX_BACKOFF = 30.0
+MAX_TRACKED_ITEMS = 100000
+
+
+#Items are ids or JSON-like events; equal events share one attempt count
+def attempt_key(item):
+    if isinstance(item, (str, int)):
+        return item
+    return json.dumps(item, sort_keys=True, default=str)
+
+
+class QueueWorkerPool:
+    # Workers that take batches off a Hazelcast queue (an AsyncProxy from
+    # shared.hz_async) and pass them to `handler`. Each worker waits up to
+    # `poll_timeout` for one item, then drains up to `batch_size` in total.
+    # If the handler raises, the items of the batch are retried one by one, so
+    # a bad item does not hold back the others. Items that still fail are put
+    # back on the queue; after `max_attempts` they are handed to `on_give_up`
+    # (e.g. to mark them failed) instead. Attempts are counted per process.
+    def __init__(self, queue, handler, workers=4, batch_size=32, poll_timeout=1.0,
+                 max_attempts=10, on_give_up=None):
+        self.queue = queue
+        self.handler = handler
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_timeout = poll_timeout
+        self.max_attempts = max_attempts
+        self.on_give_up = on_give_up
+        self.attempts = OrderedDict()  # attempt_key(item) -> failed attempts
+        self.tasks = []
+        self.stopping = False
+        self.batches = 0
+        self.items = 0
+        self.requeued = 0
+        self.dropped = 0
+        self.given_up = 0
+
+    def start(self):
+        self.tasks = [asyncio.create_task(self.consume()) for _ in range(self.workers)]
+
+    #Workers finish their current poll instead of being cancelled, so an
+    #item taken off the queue is never dropped halfway
+    async def stop(self):
+        self.stopping = True
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    async def consume(self):
+        failures = 0
+        while not self.stopping:
+            try:
+                item = await self.queue.poll(self.poll_timeout)
+                if item is None:
+                    continue
+                batch = [item]
+                if self.batch_size > 1:
+                    await self.queue.drain_to(batch, self.batch_size - 1)
+            except Exception as e:
+                print(f"Failed to read {self.queue.name}:", e)
+                await asyncio.sleep(self.poll_timeout)
+                continue
+
+            try:
+                await self.handler(batch)
+            except Exception as e:
+                print(f"Failed to process {len(batch)} items from {self.queue.name}:", e)
+                failed = await self.run_one_by_one(batch) if len(batch) > 1 else batch
+            else:
+                failed = []
+                self.batches += 1
+                self.items += len(batch)
+            self.forget([item for item in batch if item not in failed])
+
+            if not failed:
+                failures = 0
+                continue
+            await self.retry_later(failed)
+            # Backs off further while failures continue, e.g. during an outage
+            failures += 1
+            await asyncio.sleep(min(self.poll_timeout * 2 ** (failures - 1), MAX_BACKOFF))
+
+    async def run_one_by_one(self, batch):
+        failed = []
+        for item in batch:
+            try:
+                await self.handler([item])
+            except Exception as e:
+                print(f"Failed to process item from {self.queue.name}:", e)
+                failed.append(item)
+                continue
+            self.items += 1
+        return failed
+
+    def forget(self, items):
+        for item in items:
+            self.attempts.pop(attempt_key(item), None)
+
+    async def retry_later(self, items):
+        retry = []
+        give_up = []
+        for item in items:
+            key = attempt_key(item)
+            attempts = self.attempts.pop(key, 0) + 1
+            if attempts >= self.max_attempts:
+                give_up.append(item)
+            else:
+                self.attempts[key] = attempts
+                retry.append(item)
+        while len(self.attempts) > MAX_TRACKED_ITEMS:
+            self.attempts.popitem(last=False)
+        if retry:
+            await self.requeue(retry)
+        if give_up:
+            await self.give_up(give_up)
+
+    #Retries with a growing back-off; the batch is only dropped (and logged)
+    #when the queue keeps refusing it, so the worker itself keeps running
+    async def requeue(self, batch):
+        for attempt in range(1, REQUEUE_ATTEMPTS + 1):
+            try:
+                await self.queue.add_all(batch)
+                self.requeued += len(batch)
+                return
+            except Exception as e:
+                print(f"Failed to requeue {len(batch)} items on {self.queue.name} (attempt {attempt}):", e)
+                await asyncio.sleep(self.poll_timeout * attempt)
+        self.dropped += len(batch)
+        print(f"Dropped items from {self.queue.name}:", batch)
+
+    async def give_up(self, items):
+        self.given_up += len(items)
+        print(f"Giving up on {len(items)} items from {self.queue.name} after {self.max_attempts} attempts:", items)
+        if self.on_give_up is None:
+            return
+        try:
+            await self.on_give_up(items)
+        except Exception as e:
+            print(f"Failed to hand over given-up items from {self.queue.name}:", e)
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "batch_size": self.batch_size,
+            "max_attempts": self.max_attempts,
+            "batches": self.batches,
+            "items": self.items,
+            "requeued": self.requeued,
+            "dropped": self.dropped,
+            "given_up": self.given_up,
+            "retrying": len(self.attempts),
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+        }
@@ -0,0 +1,69 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResponseCache:
+    # Bounded TTL + LRU cache of upstream GET responses. Entries are tagged
+    # with the upstream they came from so Hazelcast entry listeners can drop
+    # exactly the list and item responses a changed key affects. Listener
+    # callbacks run on the Hazelcast client thread, hence the lock.
+    def __init__(self, max_entries=1024, ttl=30.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.generations = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def generation(self, tag):
+        with self.lock:
+            return self.generations.get(tag, 0)
+
+    #Skips the write if the tag was invalidated while the response was in flight
+    def put(self, key, value, tag, generation):
+        with self.lock:
+            if self.generations.get(tag, 0) != generation:
+                return
+            self.entries[key] = (value, time.monotonic() + self.ttl, tag)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, tag, paths=None):
+        with self.lock:
+            self.generations[tag] = self.generations.get(tag, 0) + 1
+            for key in list(self.entries):
+                if self.entries[key][2] == tag and (paths is None or key[0] in paths):
+                    del self.entries[key]
+                    self.invalidations += 1
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
@@ -0,0 +1,195 @@
+import json
+import time
+import uuid
+from typing import Dict
+
+from hazelcast.core import HazelcastJsonValue
+from hazelcast.serialization.api import CompactSerializer
+from pydantic import BaseModel
+
+
+# Records stored in Hazelcast maps. They are written with Compact
+# serialization: a compact binary layout whose schema is registered with the
+# cluster once, so values are small, cheap to (de)serialize and queryable by
+# field on the members.
+
+class InventoryItem(BaseModel):
+    id: str
+    name: str
+    quantity: int
+    available_quantity: int
+    price: float
+    category: str = "General"
+
+#to store user info in the db - login and hashed password
+class UserInDB(BaseModel):
+    login: str
+    hashed_password: str
+    user_id: str
+
+class OrderPart(BaseModel):
+    id: str
+    quantity: int
+
+#One order with all its parts, keyed by a generated id
+class Order(BaseModel):
+    id: str
+    user_id: str
+    parts: Dict[str, int]
+    status: str = "placed"
+    created_at: float
+
+class Repair(Order):
+    pass
+
+#Outcome of a reservation sent with an idempotency key, replayed on retries
+class Reservation(BaseModel):
+    reserved: Dict[str, int]
+    missing: Dict[str, int]
+
+
+class InventoryItemSerializer(CompactSerializer[InventoryItem]):
+    def read(self, reader):
+        return InventoryItem.model_construct(
+            id=reader.read_string("id"),
+            name=reader.read_string("name"),
+            quantity=reader.read_int64("quantity"),
+            available_quantity=reader.read_int64("available_quantity"),
+            price=reader.read_float64("price"),
+            category=reader.read_string("category"),
+        )
+
+    def write(self, writer, obj):
+        writer.write_string("id", obj.id)
+        writer.write_string("name", obj.name)
+        writer.write_int64("quantity", obj.quantity)
+        writer.write_int64("available_quantity", obj.available_quantity)
+        writer.write_float64("price", obj.price)
+        writer.write_string("category", obj.category)
+
+    def get_class(self):
+        return InventoryItem
+
+    def get_type_name(self):
+        return "InventoryItem"
+
+
+class UserInDBSerializer(CompactSerializer[UserInDB]):
+    def read(self, reader):
+        return UserInDB.model_construct(
+            login=reader.read_string("login"),
+            hashed_password=reader.read_string("hashed_password"),
+            user_id=reader.read_string("user_id"),
+        )
+
+    def write(self, writer, obj):
+        writer.write_string("login", obj.login)
+        writer.write_string("hashed_password", obj.hashed_password)
+        writer.write_string("user_id", obj.user_id)
+
+    def get_class(self):
+        return UserInDB
+
+    def get_type_name(self):
+        return "UserInDB"
+
+
+class OrderPartSerializer(CompactSerializer[OrderPart]):
+    def read(self, reader):
+        return OrderPart.model_construct(id=reader.read_string("id"), quantity=reader.read_int64("quantity"))
+
+    def write(self, writer, obj):
+        writer.write_string("id", obj.id)
+        writer.write_int64("quantity", obj.quantity)
+
+    def get_class(self):
+        return OrderPart
+
+    def get_type_name(self):
+        return "OrderPart"
+
+
+class OrderSerializer(CompactSerializer[Order]):
+    # Shared by orders and repairs; parts are stored as two parallel arrays
+    def __init__(self, model=Order):
+        self.model = model
+
+    def read(self, reader):
+        return self.model.model_construct(
+            id=reader.read_string("id"),
+            user_id=reader.read_string("user_id"),
+            parts=dict(zip(reader.read_array_of_string("part_ids"), reader.read_array_of_int64("quantities"))),
+            status=reader.read_string("status"),
+            created_at=reader.read_float64("created_at"),
+        )
+
+    def write(self, writer, obj):
+        writer.write_string("id", obj.id)
+        writer.write_string("user_id", obj.user_id)
+        writer.write_array_of_string("part_ids", list(obj.parts))
+        writer.write_array_of_int64("quantities", list(obj.parts.values()))
+        writer.write_string("status", obj.status)
+        writer.write_float64("created_at", obj.created_at)
+
+    def get_class(self):
+        return self.model
+
+    def get_type_name(self):
+        return self.model.__name__
+
+
+class ReservationSerializer(CompactSerializer[Reservation]):
+    def read(self, reader):
+        return Reservation.model_construct(
+            reserved=dict(zip(reader.read_array_of_string("reserved_ids"), reader.read_array_of_int64("reserved_quantities"))),
+            missing=dict(zip(reader.read_array_of_string("missing_ids"), reader.read_array_of_int64("missing_quantities"))),
+        )
+
+    def write(self, writer, obj):
+        writer.write_array_of_string("reserved_ids", list(obj.reserved))
+        writer.write_array_of_int64("reserved_quantities", list(obj.reserved.values()))
+        writer.write_array_of_string("missing_ids", list(obj.missing))
+        writer.write_array_of_int64("missing_quantities", list(obj.missing.values()))
+
+    def get_class(self):
+        return Reservation
+
+    def get_type_name(self):
+        return "Reservation"
+
+
+#Pass as HazelcastClient(compact_serializers=...) in every client that reads records
+COMPACT_SERIALIZERS = [
+    InventoryItemSerializer(),
+    UserInDBSerializer(),
+    OrderPartSerializer(),
+    OrderSerializer(Order),
+    OrderSerializer(Repair),
+    ReservationSerializer(),
+]
+
+
+#Time-ordered, so key-paged listings of orders and repairs come out oldest first
+def new_record_id():
+    return f"{time.time_ns() // 1_000_000:013d}-{uuid.uuid4().hex[:12]}"
+
+
+#Reads a value written in any earlier format: pickled dict, HazelcastJsonValue
+#or json.dumps string (auth). Records pass through unchanged.
+def to_record(model, value):
+    if value is None or isinstance(value, model):
+        return value
+    if isinstance(value, HazelcastJsonValue):
+        value = value.loads()
+    elif isinstance(value, str):
+        value = json.loads(value)
+    return model(**value)
+
+
+#JSON-ready form of a stored value, used when listing maps
+def to_plain(value):
+    if isinstance(value, BaseModel):
+        return value.dict()
+    if isinstance(value, HazelcastJsonValue):
+        return value.loads()
+    return value
@@ -0,0 +1,28 @@
+import asyncio
+
+
+class SingleFlight:
+    # Concurrent calls with the same key share one in-flight task. The task is
+    # shielded, so a caller that disconnects does not cancel it for the others.
+    def __init__(self):
+        self.in_flight = {}
+        self.executed = 0
+        self.shared = 0
+
+    async def do(self, key, fn):
+        task = self.in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self.in_flight[key] = task
+            task.add_done_callback(lambda _: self.in_flight.pop(key, None))
+            self.executed += 1
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    def stats(self):
+        return {
+            "in_flight": len(self.in_flight),
+            "executed": self.executed,
+            "shared": self.shared,
+        }
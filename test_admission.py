@@ -0,0 +1,55 @@
+import asyncio
+import math
+import time
+
+from shared.admission import ConcurrencyLimiter, RateLimiter
+
+def test_rate_limiter_allows_burst_then_throttles():
+    limiter = RateLimiter(rate=1.0, burst=3)
+    assert [limiter.acquire("u") for _ in range(3)] == [0.0, 0.0, 0.0]
+    retry_after = limiter.acquire("u")
+    assert 0 < retry_after <= 1.0
+    assert limiter.acquire("other") == 0.0
+
+def test_rate_limiter_refills_over_time():
+    limiter = RateLimiter(rate=100.0, burst=1)
+    assert limiter.acquire("u") == 0.0
+    time.sleep(0.02)
+    assert limiter.acquire("u") == 0.0
+
+def test_rate_limiter_cost_above_burst_is_never_allowed():
+    limiter = RateLimiter(rate=10.0, burst=5)
+    assert limiter.acquire("u", cost=6) == math.inf
+    assert limiter.acquire("u", cost=5) == 0.0
+
+def test_rate_limiter_forgets_least_recent_keys():
+    limiter = RateLimiter(burst=1, max_keys=2)
+    for key in ("a", "b", "c"):
+        limiter.acquire(key)
+    assert list(limiter.buckets) == ["b", "c"]
+
+def test_concurrency_limiter_queues_and_rejects():
+    async def run():
+        limiter = ConcurrencyLimiter(max_concurrent=1, max_queue=1, queue_timeout=1.0)
+        assert await limiter.acquire()
+        waiting = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        assert not await limiter.acquire()  # queue is full
+        limiter.release()
+        assert await waiting
+        limiter.release()
+        return limiter.stats()
+
+    stats = asyncio.run(run())
+    assert stats["active"] == 0
+    assert stats["rejected"] == 1
+
+def test_concurrency_limiter_queue_timeout():
+    async def run():
+        limiter = ConcurrencyLimiter(max_concurrent=1, max_queue=1, queue_timeout=0.01)
+        await limiter.acquire()
+        return await limiter.acquire(), limiter.stats()
+
+    admitted, stats = asyncio.run(run())
+    assert not admitted
+    assert stats["timed_out"] == 1
@@ -0,0 +1,58 @@
+import time
+
+from shared.health_monitor import CircuitBreaker, HealthMonitor
+
+def open_breaker(**kwargs):
+    breaker = CircuitBreaker(failure_threshold=2, **kwargs)
+    breaker.record_failure()
+    breaker.record_failure()
+    return breaker
+
+def test_opens_after_threshold():
+    breaker = CircuitBreaker(failure_threshold=2)
+    breaker.record_failure()
+    assert breaker.is_available()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+
+def test_half_open_lets_one_trial_through():
+    breaker = open_breaker(reset_timeout=0.01)
+    time.sleep(0.02)
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_failed_trial_reopens():
+    breaker = open_breaker(reset_timeout=0.01)
+    time.sleep(0.02)
+    breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+
+def test_unreported_trial_expires():
+    breaker = open_breaker(reset_timeout=0.01, trial_timeout=0.01)
+    time.sleep(0.02)
+    assert breaker.allow_request()
+    assert not breaker.is_available()
+    time.sleep(0.02)
+    assert breaker.allow_request()
+
+def test_probe_success_only_half_opens():
+    breaker = open_breaker(reset_timeout=60.0)
+    breaker.record_probe_success()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+def test_pick_skips_ejected_instances():
+    monitor = HealthMonitor(http_pool=None, failure_threshold=1)
+    monitor.set_instances("orders", ["http://a", "http://b"])
+    monitor.record_failure("http://a")
+    assert monitor.live_instances("orders") == ["http://b"]
+    assert monitor.pick("orders") == "http://b"
+
+def test_set_instances_drops_breakers_of_removed_instances():
+    monitor = HealthMonitor(http_pool=None)
+    monitor.set_instances("orders", ["http://a", "http://b"])
+    monitor.set_instances("orders", ["http://b"])
+    assert list(monitor.breakers) == ["http://b"]
@@ -54,6 +54,25 @@ async def test_log_inventory():
         print(f"Log Inventory Error: {e}")
         return False
 
+async def test_batch_get_inventory():
+    url = "http://localhost:5680/inventory/batch_get"
+    request_data = {"ids": ["product_test_1", "product_test_2", "product_does_not_exist"]}
+
+    try:
+        async with httpx.AsyncClient() as client:
+            response = await client.post(url, json=request_data)
+            print("\nTesting Batch Get Inventory:")
+            print(f"POST {url}")
+            print(f"Status Code: {response.status_code}")
+            print(f"Response: {response.text[:100]}..." if len(response.text) > 100 else f"Response: {response.text}")
+            if response.status_code != 200:
+                return False
+            data = response.json()
+            return "product_test_1" in data["items"] and data["missing"] == ["product_does_not_exist"]
+    except Exception as e:
+        print(f"Batch Get Inventory Error: {e}")
+        return False
+
 async def debug_inventory_tests():
     print("===== INVENTORY API DEBUG TESTS =====")
 
@@ -67,10 +86,16 @@ async def debug_inventory_tests():
     log_ok = await test_log_inventory()
     print(f"Log Inventory Test: {'PASSED' if log_ok else 'FAILED'}")
 
+    # Test 3: Getting several items at once
+    print("\nTest 3: Batch Get Inventory")
+    batch_ok = await test_batch_get_inventory()
+    print(f"Batch Get Inventory Test: {'PASSED' if batch_ok else 'FAILED'}")
+
     # Summary
     print("\n===== TEST SUMMARY =====")
     print(f"Inventory API Connection: {'OK' if conn_ok else 'NOT WORKING'}")
     print(f"Log Inventory: {'OK' if log_ok else 'NOT WORKING'}")
+    print(f"Batch Get Inventory: {'OK' if batch_ok else 'NOT WORKING'}")
 
     if not conn_ok:
         print("\nTROUBLESHOOTING TIPS:")
@@ -0,0 +1,58 @@
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "inventory_service")))
+from inventory_service import InvalidRow, iter_json_array_rows, iter_ndjson_rows
+
+async def stream(chunks):
+    for chunk in chunks:
+        yield chunk
+
+def read_rows(parser, chunks):
+    async def collect():
+        return [row async for row in parser(stream(chunks))]
+    return asyncio.run(collect())
+
+def plain(rows):
+    return [("invalid" if isinstance(row, InvalidRow) else row) for row in rows]
+
+def every_split(body):
+    for i in range(1, len(body)):
+        yield [body[:i], body[i:]]
+
+def test_array_whole_body():
+    assert read_rows(iter_json_array_rows, [b'[{"a": 1}, {"b": [1, 2]}, 3]']) == [{"a": 1}, {"b": [1, 2]}, 3]
+
+def test_array_any_two_chunks():
+    body = b' [{"a": "x,]\\"}"}, 123, -4.5e1, true, null, {"n": {"m": []}}]'
+    expected = [{"a": 'x,]"}'}, 123, -45.0, True, None, {"n": {"m": []}}]
+    for chunks in every_split(body):
+        assert read_rows(iter_json_array_rows, chunks) == expected, chunks
+
+def test_array_byte_by_byte():
+    body = '[{"name": "ключ"}, 123]'.encode()
+    assert read_rows(iter_json_array_rows, [body[i:i + 1] for i in range(len(body))]) == [{"name": "ключ"}, 123]
+
+def test_array_scalar_split_across_chunks():
+    assert read_rows(iter_json_array_rows, [b'[1', b'23, 4', b'5]']) == [123, 45]
+
+def test_array_malformed_element_is_skipped():
+    body = b'[{"a":1}, {"bad": }, {"c":3}]'
+    for chunks in [[body], *every_split(body)]:
+        assert plain(read_rows(iter_json_array_rows, chunks)) == [{"a": 1}, "invalid", {"c": 3}], chunks
+
+def test_array_empty_elements():
+    assert read_rows(iter_json_array_rows, [b"[]"]) == []
+    assert plain(read_rows(iter_json_array_rows, [b"[1,,2,]"])) == [1, "invalid", 2]
+
+def test_array_errors():
+    for body in (b'{"a": 1}', b"[1, 2", b'[{"a": "]'):
+        try:
+            read_rows(iter_json_array_rows, [body])
+        except ValueError:
+            continue
+        raise AssertionError(f"{body!r} was accepted")
+
+def test_ndjson_lines_split_across_chunks():
+    assert read_rows(iter_ndjson_rows, [b'{"a"', b': 1}\n\n{"b": 2}', b"\n3"]) == ['{"a": 1}', '{"b": 2}', "3"]
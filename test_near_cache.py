@@ -0,0 +1,64 @@
+import time
+
+from shared.near_cache import NearCache
+
+def test_get_after_put():
+    cache = NearCache()
+    cache.put("a", 1, cache.generation())
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.stats()["hits"] == 1
+
+def test_entries_expire_after_ttl():
+    cache = NearCache(ttl=0.01)
+    cache.put("a", 1, cache.generation())
+    time.sleep(0.02)
+    assert cache.get("a") is None
+
+def test_load_invalidated_meanwhile_is_not_cached():
+    cache = NearCache()
+    generation = cache.generation()
+    cache.invalidate(["a"])
+    cache.put("a", "stale", generation)
+    assert cache.get("a") is None
+
+def test_invalidating_other_keys_does_not_block_loads():
+    cache = NearCache()
+    generation = cache.generation()
+    cache.invalidate(["b"])
+    cache.put("a", 1, generation)
+    assert cache.get("a") == 1
+
+def test_clear_blocks_loads_in_flight():
+    cache = NearCache()
+    generation = cache.generation()
+    cache.invalidate()
+    cache.put("a", 1, generation)
+    assert cache.get("a") is None
+
+def test_lru_evicts_least_recently_read():
+    cache = NearCache(max_size=2, eviction="lru")
+    for key in ("a", "b"):
+        cache.put(key, key, cache.generation())
+    cache.get("a")
+    cache.put("c", "c", cache.generation())
+    assert cache.get("b") is None
+    assert cache.get("a") == "a"
+
+def test_lfu_evicts_least_frequently_read():
+    cache = NearCache(max_size=2, eviction="lfu")
+    for key in ("a", "b"):
+        cache.put(key, key, cache.generation())
+    cache.get("b")
+    cache.get("b")
+    cache.get("a")
+    cache.put("c", "c", cache.generation())
+    assert cache.get("a") is None
+    assert cache.get("b") == "b"
+
+def test_invalidation_times_are_pruned_after_ttl():
+    cache = NearCache(ttl=0.01)
+    cache.invalidate(["a"])
+    time.sleep(0.02)
+    cache.invalidate(["b"])
+    assert list(cache.invalidated_at) == ["b"]
@@ -0,0 +1,29 @@
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "inventory_service")))
+from inventory_service import allocate
+
+def stock(**available):
+    return {part_id: {"id": part_id, "available_quantity": quantity} for part_id, quantity in available.items()}
+
+def test_reserves_when_everything_is_available():
+    items = stock(a=5, b=2)
+    assert allocate(items, {"a": 3, "b": 2}, partial=False) == ({"a": 3, "b": 2}, {})
+    assert items["a"]["available_quantity"] == 2
+    assert items["b"]["available_quantity"] == 0
+
+def test_all_or_nothing_when_a_part_is_short():
+    items = stock(a=5, b=1)
+    assert allocate(items, {"a": 3, "b": 2}, partial=False) == ({}, {"b": 1})
+    assert items["a"]["available_quantity"] == 5
+
+def test_partial_reserves_what_is_available():
+    items = stock(a=5, b=1)
+    assert allocate(items, {"a": 3, "b": 2, "c": 4}, partial=True) == ({"a": 3, "b": 1}, {"b": 1, "c": 4})
+    assert items["b"]["available_quantity"] == 0
+
+def test_requests_in_one_batch_see_earlier_reservations():
+    items = stock(a=3)
+    assert allocate(items, {"a": 2}, partial=False) == ({"a": 2}, {})
+    assert allocate(items, {"a": 2}, partial=False) == ({}, {"a": 1})